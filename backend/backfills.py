@@ -0,0 +1,92 @@
+"""Batched, resumable data backfills that run after schema migrations.
+
+Alembic revisions only change the schema, so they stay quick even on a large
+journal database. Filling new columns with derived data is done here instead,
+in small primary-key ordered batches that each commit on their own. The write
+lock is held for one batch at a time, letting API requests interleave, and a
+run that is interrupted simply picks up the rows that still match `pending`.
+
+Run all registered backfills to completion with:
+    python backfills.py
+"""
+import time
+
+from sqlalchemy import bindparam, select
+
+from database import Analysis, count_words, create_summary
+
+class Backfill:
+    """A derived-data update applied to every row matching `pending`.
+
+    `compute` receives a row with the `id` and the requested `columns` and
+    returns a dict of column values to write. Written rows must stop matching
+    `pending`, which is what makes the backfill resumable.
+    """
+
+    def __init__(self, name, table, columns, pending, compute, batch_size=500):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.pending = pending
+        self.compute = compute
+        self.batch_size = batch_size
+
+def analysis_summary_values(row):
+    return {"summary": create_summary(row.ai_response), "word_count": count_words(row.ai_response)}
+
+analyses = Analysis.__table__
+
+# Registered backfills, applied in order
+BACKFILLS = [
+    Backfill(
+        "analysis_summary",
+        analyses,
+        [analyses.c.ai_response],
+        analyses.c.summary.is_(None),
+        analysis_summary_values,
+        batch_size=200,
+    ),
+]
+
+def backfill_in_batches(engine, backfill: Backfill, pause: float = 0.01) -> int:
+    """Apply a backfill in short transactions and return the number of rows updated"""
+    table = backfill.table
+    id_column = table.c.id
+    update = table.update().where(id_column == bindparam("row_id"))
+    last_id = 0
+    updated = 0
+
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(id_column, *backfill.columns)
+                .where(backfill.pending, id_column > last_id)
+                .order_by(id_column)
+                .limit(backfill.batch_size)
+            ).all()
+            if not rows:
+                break
+            conn.execute(update, [{"row_id": row.id, **backfill.compute(row)} for row in rows])
+
+        last_id = rows[-1].id
+        updated += len(rows)
+        # Give request handlers a chance to take the write lock between batches
+        time.sleep(pause)
+
+    return updated
+
+def run_backfills(engine, pause: float = 0.01):
+    """Run every registered backfill, logging failures instead of raising"""
+    for backfill in BACKFILLS:
+        try:
+            updated = backfill_in_batches(engine, backfill, pause)
+            if updated:
+                print(f"Backfill {backfill.name}: updated {updated} rows")
+        except Exception as e:
+            print(f"Backfill {backfill.name} failed: {e}")
+
+if __name__ == "__main__":
+    from database import engine, init_database
+
+    init_database()
+    run_backfills(engine, pause=0)
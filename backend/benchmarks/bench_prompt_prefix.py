@@ -0,0 +1,86 @@
+"""Prompt evaluation cost of consecutive SMART field calls, by prompt layout.
+
+"interleaved" mirrors the old prompts: one raw prompt that starts with the
+goal details and follows them with the instructions, so nothing the model
+server evaluated for the previous call can be reused. "prefix" is the current
+layout: the instructions as a fixed system prompt (SMART_SYSTEM_PROMPT plus the
+field's instructions) and only the goal details after them, sent with
+keep_alive so the model and its cached prefix stay loaded.
+
+Each call reports how many prompt tokens the server actually evaluated and how
+long that took (prompt_eval_count / prompt_eval_duration). Needs a running
+Ollama server with the model pulled.
+
+Usage (from backend/):
+    python benchmarks/bench_prompt_prefix.py [--calls 8] [--field measurable]
+"""
+import argparse
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm
+import model_registry
+from main import SMART_FIELD_INSTRUCTIONS, smart_field_system_prompt
+
+GOALS = [
+    "Learn data structures and algorithms",
+    "Run a half marathon",
+    "Read 20 books this year",
+    "Build a personal finance dashboard",
+    "Sleep eight hours every night",
+    "Learn conversational Spanish",
+    "Ship a side project",
+    "Meditate daily",
+]
+
+def interleaved(goal, field):
+    instructions, example, label = SMART_FIELD_INSTRUCTIONS[field]
+    return {
+        "prompt": f'Goal: "{goal}"\nCategory: Personal\n\n{instructions}\n\n{example}\n\n{label}:',
+    }
+
+def prefix(goal, field):
+    label = SMART_FIELD_INSTRUCTIONS[field][2]
+    return {
+        "system": smart_field_system_prompt(field),
+        "prompt": f'Goal: "{goal}"\nCategory: Personal\n\n{label}:',
+        "keep_alive": llm.KEEP_ALIVE,
+    }
+
+def run(layout, calls, field):
+    client = llm.get_ollama()
+    configured = model_registry.route("generate_smart_field")
+    results = []
+    for i in range(calls):
+        response = client.generate(
+            model=configured.model,
+            options={**configured.options(), "num_predict": 32, "temperature": 0},
+            **layout(GOALS[i % len(GOALS)], field)
+        )
+        results.append((response.get("prompt_eval_count") or 0, (response.get("prompt_eval_duration") or 0) / 1e6))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=8)
+    parser.add_argument("--field", default="measurable", choices=sorted(SMART_FIELD_INSTRUCTIONS))
+    args = parser.parse_args()
+
+    # Load the model first so neither layout pays for it
+    llm.load_model(model_registry.route("generate_smart_field").model)
+
+    for name, layout in (("interleaved", interleaved), ("prefix", prefix)):
+        results = run(layout, args.calls, args.field)
+        # The first call of a layout has nothing to reuse yet
+        steady = results[1:] or results
+        print(
+            f"{name:12s} first call {results[0][0]:5d} tokens {results[0][1]:8.1f} ms | "
+            f"next calls avg {statistics.mean(r[0] for r in steady):7.1f} tokens "
+            f"{statistics.mean(r[1] for r in steady):8.1f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Query latency and recall of the note vector index, exact vs IVF search.
+
+Fills a VectorIndex in a temporary directory with synthetic clustered vectors
+(like embeddings of notes about a limited set of topics), then times queries
+in both modes and reports how many of the exact top-k results IVF finds.
+Needs no model server.
+
+Usage (from backend/):
+    python benchmarks/bench_semantic_search.py [--rows 200000] [--dim 384] [--queries 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_index import VectorIndex
+
+def synthetic(rows: int, dim: int, topics: int, rng) -> np.ndarray:
+    centres = rng.standard_normal((topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, rows)
+    return centres[labels] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = synthetic(args.rows, args.dim, 200, rng)
+    queries = synthetic(args.queries, args.dim, 200, rng)
+
+    with tempfile.TemporaryDirectory() as path:
+        index = VectorIndex(path, "bench")
+        start = time.perf_counter()
+        index.upsert((i, vector, 0, i % 3650) for i, vector in enumerate(vectors))
+        print(f"insert {args.rows} x {args.dim}: {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        index.build_ivf()
+        print(f"build ivf: {time.perf_counter() - start:.2f}s")
+
+        results = {}
+        for mode in ("exact", "ivf"):
+            timings = []
+            results[mode] = []
+            for query in queries:
+                start = time.perf_counter()
+                matches, _ = index.search(query, args.k, mode=mode)
+                timings.append((time.perf_counter() - start) * 1000)
+                results[mode].append({note_id for note_id, _ in matches})
+            timings.sort()
+            print(f"{mode:>5}: median {statistics.median(timings):.2f} ms, "
+                  f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms")
+
+        recall = statistics.mean(
+            len(exact & ivf) / args.k for exact, ivf in zip(results["exact"], results["ivf"])
+        )
+        print(f"ivf recall@{args.k}: {recall:.3f}")
+
+if __name__ == "__main__":
+    main()
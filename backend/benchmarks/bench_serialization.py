@@ -0,0 +1,88 @@
+"""Per-row cost of serializing note listings, before and after the fast path.
+
+"model" mirrors the old GET /notes path: build a NoteResponse per row, then
+let FastAPI validate it against the response model, run jsonable_encoder and
+encode with the stdlib json module. "fast" is the current path: project row
+tuples into dicts and encode them with orjson (FastJSONResponse).
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py [--rows 5000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from main import NoteResponse, FastJSONResponse
+
+FIELDS = [
+    "id", "date", "hour", "content", "rich_content", "template_id",
+    "is_sleep", "sleep_quality", "sleep_notes", "created_at", "updated_at"
+]
+
+def make_rows(count):
+    start = datetime(2025, 1, 1)
+    rows = []
+    for i in range(count):
+        created = start + timedelta(hours=i)
+        rows.append((
+            i + 1, created.strftime("%Y-%m-%d"), created.hour,
+            f"Worked on task {i}, felt focused and made steady progress on the project.",
+            None, None, False, None, "", created, created
+        ))
+    return rows, [["work", "focused"] for _ in range(count)]
+
+def model_path(rows, tags, adapter):
+    responses = [
+        NoteResponse(
+            id=row[0], date=row[1], hour=row[2], content=row[3], rich_content=row[4],
+            tags=row_tags, template_id=row[5], is_sleep=row[6], sleep_quality=row[7],
+            sleep_notes=row[8] or "", created_at=row[9], updated_at=row[10]
+        )
+        for row, row_tags in zip(rows, tags)
+    ]
+    validated = adapter.validate_python(responses, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+def fast_path(rows, tags, response):
+    notes = [dict(zip(FIELDS, row)) for row in rows]
+    for note, row_tags in zip(notes, tags):
+        note["tags"] = row_tags
+    return response.render(notes)
+
+def best_of(repeat, fn, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows, tags = make_rows(args.rows)
+    adapter = TypeAdapter(List[NoteResponse])
+    response = FastJSONResponse.__new__(FastJSONResponse)
+
+    results = {
+        "model": best_of(args.repeat, model_path, rows, tags, adapter),
+        "fast": best_of(args.repeat, fast_path, rows, tags, response),
+    }
+    for label, (seconds, size) in results.items():
+        print(f"{label:<6} {seconds / args.rows * 1e6:7.2f} us/row   {seconds * 1000:8.1f} ms total   {size} bytes")
+    print(f"speedup {results['model'][0] / results['fast'][0]:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Cold-start benchmark: time from process launch to the first served request.
+
+Each run starts a fresh `uvicorn main:app` in a scratch directory (so the
+journal database next to main.py is never touched) and polls until `/tags`
+answers. Import time of `main` is measured separately in its own process.
+
+Usage (from backend/):
+    python benchmarks/bench_startup.py [--runs 5] [--empty-db]
+"""
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_FILE = os.path.join(BACKEND_DIR, "mental_health_journal.db")
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def prepare_workdir(empty_db):
+    workdir = tempfile.mkdtemp(prefix="flourish-bench-")
+    if not empty_db and os.path.exists(DB_FILE):
+        shutil.copy(DB_FILE, workdir)
+    return workdir
+
+def child_env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("PYTHONWARNINGS", "ignore")
+    return env
+
+def measure_import(workdir):
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=workdir, env=child_env())
+    return float(output.decode().strip().splitlines()[-1])
+
+def measure_first_request(workdir, timeout=60.0):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/tags"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=child_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("Server did not answer before the timeout")
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--empty-db", action="store_true", help="start from an empty database to include seeding")
+    args = parser.parse_args()
+
+    import_times, first_request_times = [], []
+    for _ in range(args.runs):
+        workdir = prepare_workdir(args.empty_db)
+        try:
+            import_times.append(measure_import(workdir))
+            first_request_times.append(measure_first_request(workdir))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for label, samples in (("import main", import_times), ("launch -> first request", first_request_times)):
+        print(
+            f"{label:<24} median {statistics.median(samples) * 1000:8.1f} ms"
+            f"   min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
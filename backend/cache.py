@@ -0,0 +1,123 @@
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, Hashable, Optional, Tuple
+
+class ReferenceDataCache:
+    """Versioned in-memory cache of serialized reference-data responses.
+
+    Each resource (tags, templates, ...) carries a version counter. Cached
+    bodies remember the version they were built from and are discarded as soon
+    as a write bumps it. The cache is per process, so it assumes the API runs
+    as a single worker (the default `uvicorn main:app`). Keys come from query
+    parameters, so at most `max_entries` bodies are kept, least recently used
+    dropped first.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = defaultdict(int)
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[int, str, bytes]]" = OrderedDict()
+
+    def version(self, resource: str) -> int:
+        with self._lock:
+            return self._versions[resource]
+
+    def get(self, resource: str, key: Hashable = None) -> Optional[Tuple[str, bytes]]:
+        """Return (etag, body) if a body for the current version is cached"""
+        with self._lock:
+            entry = self._entries.get((resource, key))
+            if entry is None or entry[0] != self._versions[resource]:
+                return None
+            self._entries.move_to_end((resource, key))
+            return entry[1], entry[2]
+
+    def put(self, resource: str, key: Hashable, version: int, body: bytes) -> Tuple[str, bytes]:
+        """Store a body built from `version` and return (etag, body)"""
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        with self._lock:
+            # A write may have landed while the body was being built
+            if version == self._versions[resource]:
+                self._entries[(resource, key)] = (version, etag, body)
+                self._entries.move_to_end((resource, key))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return etag, body
+
+    def invalidate(self, resource: str):
+        with self._lock:
+            self._versions[resource] += 1
+            for cache_key in [k for k in self._entries if k[0] == resource]:
+                del self._entries[cache_key]
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against a strong ETag"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+class DataVersions:
+    """Version stamps for journal data, per date plus a few global scopes.
+
+    Every bump draws from one increasing sequence, so the highest stamp over
+    a date range changes whenever anything inside that range is written.
+    Like ReferenceDataCache this lives in process memory; after a restart all
+    stamps are zero, which is fine because dependent caches start empty too.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._dates: Dict[str, int] = {}
+        self._scopes: Dict[str, int] = defaultdict(int)
+
+    def bump_dates(self, *dates: str):
+        with self._lock:
+            for day in dates:
+                self._sequence += 1
+                self._dates[day] = self._sequence
+
+    def bump_scope(self, scope: str):
+        with self._lock:
+            self._sequence += 1
+            self._scopes[scope] = self._sequence
+
+    def max_in_range(self, start_date: str, end_date: str) -> int:
+        """Highest stamp of any date in [start_date, end_date] (YYYY-MM-DD strings)"""
+        with self._lock:
+            return max(
+                (version for day, version in self._dates.items() if start_date <= day <= end_date),
+                default=0
+            )
+
+    def scope(self, scope: str) -> int:
+        with self._lock:
+            return self._scopes[scope]
+
+class LRUCache:
+    """Small thread-safe least-recently-used mapping"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, object]" = OrderedDict()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,78 @@
+"""Circuit breaker for the model server.
+
+When Ollama is down or a model is missing, every call would otherwise wait
+out a connection attempt before failing. After `threshold` consecutive
+failures the circuit opens: calls are refused at once so endpoints go
+straight to their fallbacks. While open, a background probe checks the
+server every `probe_interval` seconds and closes the circuit once it
+answers again.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the model server while the circuit is open"""
+
+class CircuitBreaker:
+    def __init__(self, probe: Callable[[], None], threshold: int = 3, probe_interval: float = 15.0):
+        self.probe = probe
+        self.threshold = threshold
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def check(self):
+        """Raise CircuitOpenError if calls are currently refused"""
+        with self._lock:
+            if self._opened_at is not None:
+                raise CircuitOpenError(f"Model server unavailable: {self._last_error}")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error) or type(error).__name__
+            if self._failures < self.threshold or self._opened_at is not None:
+                return
+            self._opened_at = time.time()
+            start_probe = not self._probing
+            self._probing = True
+        if start_probe:
+            threading.Thread(target=self._probe_until_closed, daemon=True).start()
+
+    def _probe_until_closed(self):
+        while True:
+            time.sleep(self.probe_interval)
+            try:
+                self.probe()
+            except Exception as e:
+                with self._lock:
+                    self._last_error = str(e) or type(e).__name__
+                continue
+            with self._lock:
+                self._opened_at = None
+                self._failures = 0
+                self._probing = False
+            return
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "state": "open" if self._opened_at is not None else "closed",
+                "consecutive_failures": self._failures,
+                "opened_at": datetime.fromtimestamp(self._opened_at) if self._opened_at else None,
+                "last_error": self._last_error,
+            }
@@ -1,10 +1,12 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Table, ForeignKey, JSON, Boolean, Float
+from sqlalchemy import create_engine, inspect, select, insert, Column, Integer, String, Text, DateTime, Table, ForeignKey, JSON, Boolean, Float, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime, timezone
 import os
+import threading
 
 DATABASE_URL = "sqlite:///./mental_health_journal.db"
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -21,6 +23,10 @@ note_tags = Table(
 
 class Note(Base):
     __tablename__ = "notes"
+    __table_args__ = (
+        # Covers per-day lookups and multi-day range scans ordered by hour
+        Index("ix_notes_date_hour", "date", "hour"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     date = Column(String, nullable=False)  # Format: YYYY-MM-DD
@@ -116,10 +122,66 @@ class Analysis(Base):
     notes_content = Column(JSON)  # Store the notes that were analyzed
     goals_content = Column(Text)  # Store the goals/reflection content
     ai_response = Column(Text)  # The AI analysis response
+    summary = Column(Text, nullable=True)  # First characters of ai_response, for history lists
+    word_count = Column(Integer, nullable=True)  # Words in ai_response
     model_used = Column(String, default="phi3:mini")
-    processing_time = Column(Float)  # Time taken for analysis in seconds
+    processing_time = Column(Float)  # Time taken for analysis in seconds, excluding model load
+    model_load_time = Column(Float, nullable=True)  # Seconds the model server spent loading the model
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped whenever the text is replaced
+    tier = Column(String, nullable=True)  # "full", "draft" or "refined"
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
+class NoteSummary(Base):
+    __tablename__ = "note_summaries"
+    __table_args__ = (
+        UniqueConstraint("period", "period_start", name="uq_note_summaries_period"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    period = Column(String, nullable=False)  # "day" or "week"
+    period_start = Column(String, nullable=False)  # Format: YYYY-MM-DD (Monday for weeks)
+    source_hash = Column(String, nullable=False)  # Fingerprint of the notes or day summaries used
+    summary = Column(Text, nullable=False)
+    model_used = Column(String, default="phi3:mini")
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+class LLMCall(Base):
+    """One model call: its route, token counts and where the time went"""
+    __tablename__ = "llm_calls"
+    __table_args__ = (
+        Index("ix_llm_calls_created_at", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    endpoint = Column(String, nullable=False)  # Model route, or "embed"
+    model = Column(String, nullable=False)
+    outcome = Column(String, nullable=False)  # "ok", "truncated", "cancelled" or "error"
+    prompt_tokens = Column(Integer, nullable=True)  # Prompt tokens the server evaluated
+    estimated_prompt_tokens = Column(Integer, nullable=True)  # Whole prompt, estimated from its length
+    completion_tokens = Column(Integer, nullable=True)
+    load_time = Column(Float, nullable=True)  # Seconds, as reported by the model server
+    prompt_eval_time = Column(Float, nullable=True)
+    eval_time = Column(Float, nullable=True)
+    total_time = Column(Float, nullable=True)
+    wall_time = Column(Float, nullable=False)  # Seconds from sending the request to the last part
+    tokens_per_second = Column(Float, nullable=True)  # Generation speed
+    cache_hit = Column(Boolean, nullable=True)  # Most of the prompt was reused from the server's cache
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+ANALYSIS_SUMMARY_LENGTH = 200
+
+def create_summary(text):
+    """Short preview of an analysis shown in history lists"""
+    if not text:
+        return ""
+    summary = text[:ANALYSIS_SUMMARY_LENGTH].strip()
+    if len(text) > ANALYSIS_SUMMARY_LENGTH:
+        summary += "..."
+    return summary
+
+def count_words(text):
+    return len(text.split()) if text else 0
+
 class NoteTemplate(Base):
     __tablename__ = "note_templates"
     
@@ -137,138 +199,171 @@ def get_db():
     finally:
         db.close()
 
-def create_tables():
-    Base.metadata.create_all(bind=engine)
+# Revision matching the schema that create_all used to build before
+# migrations existed; such databases are stamped with it before upgrading
+BASELINE_REVISION = "0001"
 
-def init_default_data():
-    """Initialize the database with default templates and tags"""
-    db = SessionLocal()
-    try:
-        # Check if we already have templates
-        if db.query(NoteTemplate).count() > 0:
+def alembic_config(connection=None):
+    from alembic.config import Config
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.attributes["connection"] = connection
+    return config
+
+def upgrade_schema(conn):
+    """Apply pending Alembic migrations on the given connection"""
+    from alembic import command
+
+    tables = set(inspect(conn).get_table_names())
+    if "notes" in tables and "alembic_version" not in tables:
+        command.stamp(alembic_config(conn), BASELINE_REVISION)
+    command.upgrade(alembic_config(conn), "head")
+
+# Default templates
+DEFAULT_TEMPLATES = [
+    {
+        "name": "Morning Reflection",
+        "content": "How am I feeling this morning? What are my intentions for the day?",
+        "description": "Start your day with mindful reflection",
+        "category": "Daily"
+    },
+    {
+        "name": "Work Session",
+        "content": "What am I working on? How focused do I feel? Any challenges or breakthroughs?",
+        "description": "Track work-related thoughts and productivity",
+        "category": "Work"
+    },
+    {
+        "name": "Mood Check",
+        "content": "How am I feeling right now? What might be influencing my mood?",
+        "description": "Quick emotional state assessment",
+        "category": "Emotional"
+    },
+    {
+        "name": "Gratitude",
+        "content": "What am I grateful for right now? What went well?",
+        "description": "Focus on positive aspects and appreciation",
+        "category": "Personal Development"
+    },
+    {
+        "name": "Evening Wind-down",
+        "content": "How was my day? What did I learn? What am I looking forward to tomorrow?",
+        "description": "End-of-day reflection and planning",
+        "category": "Daily"
+    }
+]
+
+# Default tags
+DEFAULT_TAGS = [
+    {"name": "Happy", "color": "#10B981"},
+    {"name": "Stressed", "color": "#EF4444"},
+    {"name": "Productive", "color": "#3B82F6"},
+    {"name": "Tired", "color": "#6B7280"},
+    {"name": "Excited", "color": "#F59E0B"},
+    {"name": "Anxious", "color": "#8B5CF6"},
+    {"name": "Peaceful", "color": "#06B6D4"},
+    {"name": "Focused", "color": "#84CC16"},
+]
+
+# Default goal categories
+DEFAULT_GOAL_CATEGORIES = [
+    {
+        "name": "Health & Fitness",
+        "description": "Physical health, exercise, nutrition, and wellness goals",
+        "icon": "Heart",
+        "color": "#EF4444",
+        "is_default": True
+    },
+    {
+        "name": "Career & Professional",
+        "description": "Work-related goals, skill development, and career advancement",
+        "icon": "Briefcase",
+        "color": "#3B82F6",
+        "is_default": True
+    },
+    {
+        "name": "Education & Learning",
+        "description": "Learning new skills, courses, certifications, and knowledge acquisition",
+        "icon": "BookOpen",
+        "color": "#8B5CF6",
+        "is_default": True
+    },
+    {
+        "name": "Personal Development",
+        "description": "Self-improvement, habits, mindfulness, and personal growth",
+        "icon": "User",
+        "color": "#10B981",
+        "is_default": True
+    },
+    {
+        "name": "Relationships & Social",
+        "description": "Family, friends, networking, and social connections",
+        "icon": "Users",
+        "color": "#F59E0B",
+        "is_default": True
+    },
+    {
+        "name": "Finance & Money",
+        "description": "Savings, investments, budgeting, and financial planning",
+        "icon": "DollarSign",
+        "color": "#059669",
+        "is_default": True
+    },
+    {
+        "name": "Creative & Hobbies",
+        "description": "Artistic pursuits, hobbies, creative projects, and self-expression",
+        "icon": "Palette",
+        "color": "#EC4899",
+        "is_default": True
+    },
+    {
+        "name": "Travel & Adventure",
+        "description": "Travel plans, experiences, and adventure goals",
+        "icon": "MapPin",
+        "color": "#06B6D4",
+        "is_default": True
+    }
+]
+
+def init_default_data(conn):
+    """Seed default templates, tags and goal categories into an empty database"""
+    # Check if we already have templates
+    if conn.execute(select(NoteTemplate.id).limit(1)).first() is not None:
+        return
+
+    conn.execute(insert(NoteTemplate), DEFAULT_TEMPLATES)
+    conn.execute(insert(Tag), DEFAULT_TAGS)
+    conn.execute(insert(GoalCategory), DEFAULT_GOAL_CATEGORIES)
+
+_init_lock = threading.Lock()
+_initialized = False
+
+def init_database():
+    """Migrate the schema and seed default data once per process.
+
+    Runs inside a BEGIN IMMEDIATE transaction so concurrent workers starting
+    against the same SQLite file serialize on the write lock instead of racing
+    to migrate or insert duplicate defaults. Data backfills run separately,
+    see backfills.py.
+    """
+    global _initialized
+    if _initialized:
+        return
+
+    with _init_lock:
+        if _initialized:
             return
-            
-        # Default templates
-        templates = [
-            {
-                "name": "Morning Reflection",
-                "content": "How am I feeling this morning? What are my intentions for the day?",
-                "description": "Start your day with mindful reflection",
-                "category": "Daily"
-            },
-            {
-                "name": "Work Session",
-                "content": "What am I working on? How focused do I feel? Any challenges or breakthroughs?",
-                "description": "Track work-related thoughts and productivity",
-                "category": "Work"
-            },
-            {
-                "name": "Mood Check",
-                "content": "How am I feeling right now? What might be influencing my mood?",
-                "description": "Quick emotional state assessment",
-                "category": "Emotional"
-            },
-            {
-                "name": "Gratitude",
-                "content": "What am I grateful for right now? What went well?",
-                "description": "Focus on positive aspects and appreciation",
-                "category": "Personal Development"
-            },
-            {
-                "name": "Evening Wind-down",
-                "content": "How was my day? What did I learn? What am I looking forward to tomorrow?",
-                "description": "End-of-day reflection and planning",
-                "category": "Daily"
-            }
-        ]
-        
-        for template_data in templates:
-            template = NoteTemplate(**template_data)
-            db.add(template)
-        
-        # Default tags
-        tags = [
-            {"name": "Happy", "color": "#10B981"},
-            {"name": "Stressed", "color": "#EF4444"},
-            {"name": "Productive", "color": "#3B82F6"},
-            {"name": "Tired", "color": "#6B7280"},
-            {"name": "Excited", "color": "#F59E0B"},
-            {"name": "Anxious", "color": "#8B5CF6"},
-            {"name": "Peaceful", "color": "#06B6D4"},
-            {"name": "Focused", "color": "#84CC16"},
-        ]
-        
-        for tag_data in tags:
-            tag = Tag(**tag_data)
-            db.add(tag)
-
-        # Default goal categories
-        goal_categories = [
-            {
-                "name": "Health & Fitness",
-                "description": "Physical health, exercise, nutrition, and wellness goals",
-                "icon": "Heart",
-                "color": "#EF4444",
-                "is_default": True
-            },
-            {
-                "name": "Career & Professional",
-                "description": "Work-related goals, skill development, and career advancement",
-                "icon": "Briefcase",
-                "color": "#3B82F6",
-                "is_default": True
-            },
-            {
-                "name": "Education & Learning",
-                "description": "Learning new skills, courses, certifications, and knowledge acquisition",
-                "icon": "BookOpen",
-                "color": "#8B5CF6",
-                "is_default": True
-            },
-            {
-                "name": "Personal Development",
-                "description": "Self-improvement, habits, mindfulness, and personal growth",
-                "icon": "User",
-                "color": "#10B981",
-                "is_default": True
-            },
-            {
-                "name": "Relationships & Social",
-                "description": "Family, friends, networking, and social connections",
-                "icon": "Users",
-                "color": "#F59E0B",
-                "is_default": True
-            },
-            {
-                "name": "Finance & Money",
-                "description": "Savings, investments, budgeting, and financial planning",
-                "icon": "DollarSign",
-                "color": "#059669",
-                "is_default": True
-            },
-            {
-                "name": "Creative & Hobbies",
-                "description": "Artistic pursuits, hobbies, creative projects, and self-expression",
-                "icon": "Palette",
-                "color": "#EC4899",
-                "is_default": True
-            },
-            {
-                "name": "Travel & Adventure",
-                "description": "Travel plans, experiences, and adventure goals",
-                "icon": "MapPin",
-                "color": "#06B6D4",
-                "is_default": True
-            }
-        ]
-        
-        for category_data in goal_categories:
-            category = GoalCategory(**category_data)
-            db.add(category)
-        
-        db.commit()
-    except Exception as e:
-        print(f"Error initializing default data: {e}")
-        db.rollback()
-    finally:
-        db.close() 
\ No newline at end of file
+
+        with engine.connect() as conn:
+            try:
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+                upgrade_schema(conn)
+                init_default_data(conn)
+                conn.commit()
+            except Exception as e:
+                print(f"Error initializing database: {e}")
+                conn.rollback()
+                raise
+
+        _initialized = True
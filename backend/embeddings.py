@@ -0,0 +1,76 @@
+"""Text embedders for the semantic note index.
+
+Two embedders share one interface, a `name` that identifies the vector space
+and `embed(texts) -> list of vectors`:
+
+    HashingEmbedder  Deterministic and offline. Words, word pairs and word
+                     trigrams are hashed into a fixed number of signed
+                     buckets, so notes sharing words or word stems end up
+                     close together. Needs no model and gives the same
+                     vectors on every machine.
+    OllamaEmbedder   Ollama's embedding endpoint with an embedding model
+                     (EMBEDDING_MODEL, default nomic-embed-text), for
+                     matches by meaning rather than wording.
+
+Settings (environment):
+    EMBEDDER         "local" (default) or "ollama"
+    EMBEDDING_MODEL  Model used by the Ollama embedder
+    EMBEDDING_DIM    Buckets of the local embedder. Default 384.
+"""
+import hashlib
+import os
+import re
+from typing import List
+
+import llm
+from model_registry import EMBEDDING_MODEL
+
+EMBEDDER = os.getenv("EMBEDDER", "local")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "384"))
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+def text_digest(text: str) -> int:
+    """Signed 64-bit digest of a text, to tell whether it needs embedding again"""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little", signed=True)
+
+class HashingEmbedder:
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def features(self, text: str) -> List[tuple]:
+        """(feature, weight) pairs: words, adjacent word pairs and word trigrams"""
+        words = WORD_PATTERN.findall(text.lower())
+        features = [(word, 1.0) for word in words]
+        features += [(f"{first} {second}", 0.5) for first, second in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            features += [(padded[i:i + 3], 0.25) for i in range(len(padded) - 2)]
+        return features
+
+    def embed_one(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for feature, weight in self.features(text):
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += weight if digest[4] & 1 else -weight
+        return vector
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_one(text) for text in texts]
+
+class OllamaEmbedder:
+    def __init__(self, model: str = EMBEDDING_MODEL):
+        self.model = model
+        self.name = f"ollama-{model}"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return llm.embed(texts, self.model)
+
+def embedder_from_env():
+    if EMBEDDER == "ollama":
+        return OllamaEmbedder()
+    if EMBEDDER == "local":
+        return HashingEmbedder()
+    raise ValueError(f"Unknown EMBEDDER {EMBEDDER!r}; use 'local' or 'ollama'")
@@ -0,0 +1,88 @@
+"""Background jobs that work through a list of items with a bounded pool.
+
+A job is created with its items and started on a thread of its own; the
+thread hands the items to a ThreadPoolExecutor, so at most `workers` of them
+run at once. Each item's status (pending, running, then the status its work
+function returns, or "failed") is kept on the job, and `snapshot` reports it
+for progress polling. Items known up front to need no work can be created
+with a final status such as "skipped".
+
+Jobs live in memory only; JobRegistry keeps the most recent `max_jobs`.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+FINAL_STATUSES = {"skipped", "done", "failed", "truncated"}
+
+class BatchJob:
+    def __init__(self, kind: str, items: List[Tuple[str, str]]):
+        """`items` are (key, initial status) pairs, in processing order"""
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._items: Dict[str, dict] = {key: {"status": status, "detail": None} for key, status in items}
+
+    def pending(self) -> List[str]:
+        with self._lock:
+            return [key for key, item in self._items.items() if item["status"] == "pending"]
+
+    def update(self, key: str, status: str, detail: Optional[str] = None):
+        with self._lock:
+            self._items[key] = {"status": status, "detail": detail}
+
+    def run(self, work: Callable[[str], Tuple[str, Optional[str]]], workers: int):
+        """Run `work(key) -> (status, detail)` for every pending item"""
+        def run_item(key: str):
+            self.update(key, "running")
+            try:
+                status, detail = work(key)
+            except Exception as e:
+                status, detail = "failed", str(e) or type(e).__name__
+            self.update(key, status, detail)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(run_item, self.pending()))
+        with self._lock:
+            self.finished_at = time.time()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for item in self._items.values():
+                counts[item["status"]] = counts.get(item["status"], 0) + 1
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "state": "finished" if self.finished_at is not None else "running",
+                "created_at": datetime.fromtimestamp(self.created_at),
+                "finished_at": datetime.fromtimestamp(self.finished_at) if self.finished_at else None,
+                "total": len(self._items),
+                "completed": sum(counts.get(status, 0) for status in FINAL_STATUSES),
+                "counts": counts,
+                "items": [{"key": key, **item} for key, item in self._items.items()],
+            }
+
+class JobRegistry:
+    def __init__(self, max_jobs: int = 20):
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+
+    def start(self, job: BatchJob, work: Callable[[str], Tuple[str, Optional[str]]], workers: int) -> BatchJob:
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        threading.Thread(target=job.run, args=(work, workers), daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
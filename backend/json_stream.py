@@ -0,0 +1,52 @@
+"""Incremental extraction of array items from JSON streamed by the model."""
+import json
+from typing import List, Optional
+
+class ArrayItemParser:
+    """Pulls complete objects out of JSON arrays while the text is still arriving.
+
+    Feed the chunks of a streamed reply in order. Each object whose parent is
+    an array (e.g. the slots in {"schedule": [{...}, {...}]}) is decoded and
+    returned as soon as its closing brace arrives, so whatever was complete
+    before the stream stopped is kept even if the document never finishes.
+    """
+
+    def __init__(self):
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        # Text of the array item being read, and the nesting depth it closes at
+        self._item: Optional[List[str]] = None
+        self._item_depth = 0
+
+    def feed(self, chunk: str) -> List[dict]:
+        items = []
+        for char in chunk:
+            if self._item is not None:
+                self._item.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if char == "{" and self._item is None and self._stack and self._stack[-1] == "[":
+                    self._item = ["{"]
+                    self._item_depth = len(self._stack)
+                self._stack.append(char)
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if self._item is not None and len(self._stack) == self._item_depth:
+                    text = "".join(self._item)
+                    self._item = None
+                    try:
+                        items.append(json.loads(text))
+                    except ValueError:
+                        pass
+        return items
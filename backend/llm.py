@@ -0,0 +1,313 @@
+"""Thin wrapper around the Ollama client shared by the AI endpoints.
+
+Calls name a route from model_registry, which picks the model and options.
+Every call goes through `circuit`: once the model server keeps failing, calls
+raise CircuitOpenError immediately until a background probe sees it recover.
+Embedding calls have a circuit per embedding model instead, so a missing or
+failing embedding model never stops the generations.
+Generations are streamed and stopped at their route's deadline.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Hashable, Iterator, List, NamedTuple, Optional, Union
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from model_registry import DEFAULT_MODEL, DEFAULT_ROUTE, EMBED_ROUTE, route as model_route
+from telemetry import llm_telemetry
+
+# How many generations the model server runs at once. Defaults to Ollama's
+# own OLLAMA_NUM_PARALLEL so fanned-out requests queue here, not on the server.
+LLM_PARALLELISM = max(1, int(os.getenv("LLM_PARALLELISM", os.getenv("OLLAMA_NUM_PARALLEL", "1"))))
+
+# How long the model server keeps the model loaded after a request. Sent with
+# every call so the model, and the cached evaluation of the shared system
+# prompt prefix, survive the gaps between requests.
+KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")
+
+# Consecutive failures that open the circuit, and seconds between recovery probes
+LLM_FAILURE_THRESHOLD = max(1, int(os.getenv("LLM_FAILURE_THRESHOLD", "3")))
+LLM_PROBE_INTERVAL = float(os.getenv("LLM_PROBE_INTERVAL", "15"))
+
+# Status of the server's reply when the requested model is not installed
+MISSING_MODEL_STATUS = 404
+
+# Shared by every request so concurrent endpoints together stay within the limit
+_generation_slots = threading.BoundedSemaphore(LLM_PARALLELISM)
+
+def get_ollama():
+    """Import the Ollama client on first use; only the AI endpoints need it"""
+    import ollama
+    return ollama
+
+def probe_server():
+    """Succeeds once the server answers.
+
+    Installed models are not checked: a route whose model is missing fails
+    on its own calls, and must not keep the circuit open for the others.
+    """
+    get_ollama().list()
+
+circuit = CircuitBreaker(probe_server, LLM_FAILURE_THRESHOLD, LLM_PROBE_INTERVAL)
+
+# One circuit per embedding model, created on its first call
+embedding_circuits: Dict[str, CircuitBreaker] = {}
+_embedding_circuits_lock = threading.Lock()
+
+def embedding_circuit(model: str) -> CircuitBreaker:
+    with _embedding_circuits_lock:
+        if model not in embedding_circuits:
+            embedding_circuits[model] = CircuitBreaker(probe_server, LLM_FAILURE_THRESHOLD, LLM_PROBE_INTERVAL)
+        return embedding_circuits[model]
+
+@contextmanager
+def _guarded(breaker: CircuitBreaker = circuit):
+    """Refuse the call while the circuit is open, and report how it went"""
+    breaker.check()
+    try:
+        yield
+    except DeadlineExceeded:
+        # A slow reply says nothing about whether the server is up
+        raise
+    except Exception as e:
+        if getattr(e, "status_code", None) == MISSING_MODEL_STATUS:
+            # The server answered; only the requested model is not installed
+            breaker.record_success()
+        else:
+            breaker.record_failure(e)
+        raise
+    breaker.record_success()
+
+def messages(prompt: str, system: Optional[str] = None) -> list:
+    """Chat messages with the fixed instructions first, so their evaluation is reused"""
+    result = [{'role': 'system', 'content': system}] if system else []
+    result.append({'role': 'user', 'content': prompt})
+    return result
+
+class DeadlineExceeded(TimeoutError):
+    """The route's deadline passed before the reply was complete"""
+
+class Reply(NamedTuple):
+    text: str
+    truncated: bool  # cut off at the deadline
+    stats: dict  # timings and token counts of the final response part; empty if cut off
+
+def deadline_for(route: str, limit: Optional[float] = None) -> Optional[float]:
+    """Monotonic time the route's call must end by, no later than the caller's `limit`"""
+    seconds = model_route(route).deadline
+    deadline = time.monotonic() + seconds if seconds else None
+    if limit is None:
+        return deadline
+    return min(deadline, limit) if deadline is not None else limit
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded("Generation deadline reached")
+    return remaining
+
+@contextmanager
+def _slot(deadline: Optional[float]):
+    """Wait for a generation slot, but no longer than the deadline allows"""
+    if not _generation_slots.acquire(timeout=_remaining(deadline)):
+        raise DeadlineExceeded("No generation slot free before the deadline")
+    try:
+        yield
+    finally:
+        _generation_slots.release()
+
+@contextmanager
+def _client(timeout: Optional[float]):
+    """The client for one call; one made for a timeout is closed with its connections afterwards"""
+    ollama = get_ollama()
+    if timeout is None:
+        yield ollama
+        return
+    # The read timeout bounds the wait for every part, including the first
+    with ollama.Client(timeout=timeout) as client:
+        yield client
+
+def prompt_chars(request: dict) -> int:
+    """Length of everything the model reads in a chat or generate request"""
+    chars = len(request.get('prompt') or '') + len(request.get('system') or '')
+    return chars + sum(len(message['content']) for message in request.get('messages') or [])
+
+def _stream(method: str, route: str, deadline: Optional[float], **request) -> Iterator:
+    """Yield the raw parts of a streamed chat or generate call.
+
+    Raises DeadlineExceeded once the deadline passes. Leaving the loop
+    closes the HTTP stream, which makes the model server cancel the
+    generation and free its capacity at once. Each call is recorded in
+    llm_telemetry when it ends, however it ends.
+    """
+    with _guarded(), _slot(deadline):
+        stream = None
+        stats = {}
+        # A consumer that stops reading early cancels the generation
+        outcome = "cancelled"
+        started = time.monotonic()
+        try:
+            with _client(_remaining(deadline)) as client:
+                try:
+                    stream = getattr(client, method)(stream=True, keep_alive=KEEP_ALIVE, **request)
+                    for part in stream:
+                        if part.get('done'):
+                            stats = part
+                        yield part
+                        if deadline is not None and not part.get('done') and time.monotonic() >= deadline:
+                            raise DeadlineExceeded("Generation deadline reached")
+                finally:
+                    close = getattr(stream, 'close', None)
+                    if close is not None:
+                        close()
+            outcome = "ok"
+        except DeadlineExceeded:
+            outcome = "truncated"
+            raise
+        except Exception as e:
+            # The client's read timeout firing is the deadline too
+            if deadline is not None and time.monotonic() >= deadline:
+                outcome = "truncated"
+                raise DeadlineExceeded("Generation deadline reached") from e
+            outcome = "error"
+            raise
+        finally:
+            llm_telemetry.record(
+                route, request['model'], outcome, stats, time.monotonic() - started, prompt_chars(request)
+            )
+
+def chat_parts(prompt: str, route: str = DEFAULT_ROUTE, system: Optional[str] = None,
+               schema: Optional[dict] = None, deadline: Optional[float] = None) -> Iterator:
+    """Stream a chat reply as raw response parts, within the route's deadline.
+
+    `deadline` (a time.monotonic() value) ends the call earlier, e.g. when
+    the endpoint making it has its own time limit.
+    """
+    configured = model_route(route)
+    return _stream(
+        'chat', route, deadline_for(route, deadline),
+        model=configured.model,
+        messages=messages(prompt, system),
+        options=configured.options(),
+        format=schema
+    )
+
+def chat_reply(prompt: str, route: str = DEFAULT_ROUTE, system: Optional[str] = None,
+               deadline: Optional[float] = None) -> Reply:
+    """The reply to a user message, or as much of it as arrived before the deadline"""
+    texts = []
+    stats = {}
+    try:
+        for part in chat_parts(prompt, route, system, deadline=deadline):
+            texts.append(part['message']['content'])
+            if part.get('done'):
+                stats = part
+    except DeadlineExceeded:
+        return Reply("".join(texts), True, {})
+    return Reply("".join(texts), False, stats)
+
+def chat(prompt: str, route: str = DEFAULT_ROUTE, system: Optional[str] = None,
+         deadline: Optional[float] = None) -> str:
+    """Send a user message (after an optional system prompt) and return the reply text.
+
+    Raises DeadlineExceeded if the reply is not complete by the route's
+    deadline, or by `deadline` if that comes first.
+    """
+    reply = chat_reply(prompt, route, system, deadline)
+    if reply.truncated:
+        raise DeadlineExceeded("Generation deadline reached")
+    return reply.text
+
+def load_seconds(response) -> float:
+    """Time the model server spent loading the model for a response"""
+    return (response.get('load_duration') or 0) / 1e9
+
+def load_model(model: str = DEFAULT_MODEL) -> float:
+    """Load `model` (or refresh its keep_alive) without generating; returns the load time.
+
+    An empty prompt only loads the model, so this does not take a generation slot.
+    """
+    with _guarded():
+        response = get_ollama().generate(model=model, prompt="", keep_alive=KEEP_ALIVE)
+    return load_seconds(response)
+
+def embed(texts: List[str], model: str) -> List[List[float]]:
+    """Embedding vectors of `texts` from an embedding model, in order.
+
+    Guarded by the model's own circuit, not the one of the generations, and
+    cut off at the embed route's deadline with DeadlineExceeded.
+    """
+    deadline = deadline_for(EMBED_ROUTE)
+    with _guarded(embedding_circuit(model)):
+        response = {}
+        outcome = "error"
+        started = time.monotonic()
+        try:
+            with _client(_remaining(deadline)) as client:
+                response = client.embed(model=model, input=texts, keep_alive=KEEP_ALIVE)
+            outcome = "ok"
+        except DeadlineExceeded:
+            outcome = "truncated"
+            raise
+        except Exception as e:
+            # The client's read timeout firing is the deadline too
+            if deadline is not None and time.monotonic() >= deadline:
+                outcome = "truncated"
+                raise DeadlineExceeded("Embedding deadline reached") from e
+            raise
+        finally:
+            llm_telemetry.record(
+                EMBED_ROUTE, model, outcome, response, time.monotonic() - started,
+                sum(len(text) for text in texts), prompt_cache=False
+            )
+    return [list(vector) for vector in response['embeddings']]
+
+def chat_stream(prompt: str, route: str = DEFAULT_ROUTE, system: Optional[str] = None,
+                schema: Optional[dict] = None) -> Iterator[str]:
+    """Yield the reply text in chunks as it is generated.
+
+    With `schema` the model server constrains the reply to JSON matching it.
+    Closing the iterator early stops the generation and frees the slot.
+    """
+    for part in chat_parts(prompt, route, system, schema):
+        yield part['message']['content']
+
+def generate(prompt: str, route: str = DEFAULT_ROUTE, system: Optional[str] = None) -> str:
+    """Raw completion of `prompt` after an optional system prompt, within the route's deadline"""
+    configured = model_route(route)
+    parts = _stream(
+        'generate', route, deadline_for(route),
+        model=configured.model,
+        prompt=prompt,
+        system=system,
+        options=configured.options()
+    )
+    return "".join(part['response'] for part in parts)
+
+def chat_many(prompts: Dict[Hashable, str], route: str = DEFAULT_ROUTE,
+              system: Optional[str] = None, deadline: Optional[float] = None) -> Dict[Hashable, Union[str, Exception]]:
+    """Run independent prompts concurrently, at most LLM_PARALLELISM at a time.
+
+    Returns the reply for each key, or the exception its call raised, so one
+    failed chunk does not throw away the others. `deadline` bounds the whole
+    batch: calls running then are cut off and prompts not yet started are
+    skipped with DeadlineExceeded.
+    """
+    def run(prompt):
+        if deadline is not None and time.monotonic() >= deadline:
+            return DeadlineExceeded("Batch deadline reached before this prompt started")
+        try:
+            return chat(prompt, route, system, deadline)
+        except Exception as e:
+            return e
+
+    if len(prompts) <= 1 or LLM_PARALLELISM == 1:
+        return {key: run(prompt) for key, prompt in prompts.items()}
+
+    with ThreadPoolExecutor(max_workers=min(LLM_PARALLELISM, len(prompts))) as pool:
+        futures = {key: pool.submit(run, prompt) for key, prompt in prompts.items()}
+        return {key: future.result() for key, future in futures.items()}
@@ -1,21 +1,67 @@
-import ollama
+import os
 import time
-from fastapi import FastAPI, Depends, HTTPException, Query
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Union, Optional
-from datetime import datetime, date
+from pydantic import BaseModel, TypeAdapter
+from typing import List, Dict, NamedTuple, Union, Optional
+from datetime import datetime, date, timedelta
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from database import (
-    get_db, create_tables, init_default_data,
+    get_db, init_database, engine, note_tags, SessionLocal,
+    create_summary, count_words, ANALYSIS_SUMMARY_LENGTH,
     Note, Goal, Tag, Analysis, NoteTemplate, Milestone, GoalCategory, SleepSchedule
 )
+from cache import ReferenceDataCache, DataVersions, LRUCache, etag_matches
+from backfills import run_backfills
+from model_keeper import ModelKeeper
+from precompute import PRECOMPUTE_LOOKBACK_DAYS, PrecomputeTask, Precomputer
+from responses import FastJSONResponse
+from embeddings import embedder_from_env, text_digest
+from vector_index import VectorIndex, day_number
+from retrieval import RETRIEVAL_TOKENS, RetrievedContext, retrieve_context
+from telemetry import llm_telemetry
+from json_stream import ArrayItemParser
+from jobs import BatchJob, JobRegistry
+from scheduler import DayPreferences, RecentNote, build_schedule, focus_scores, goal_demands, text_goal_demands
+import llm
+import model_registry
+from summaries import SummaryStore, stale_days, summarize_days, summarize_range
+from prompts import PromptBuilder, normalize_whitespace, relevance_scores, prompt_metrics
+
+model_keeper = ModelKeeper()
+
+# Semantic note index, opened at startup
+NOTE_INDEX_DIR = os.getenv("NOTE_INDEX_DIR", "note_index")
+# Seconds pattern analytics may spend on model calls in total, summaries included
+PATTERN_ANALYSIS_DEADLINE = float(os.getenv("PATTERN_ANALYSIS_DEADLINE", "240"))
+note_embedder = embedder_from_env()
+note_index: Optional[VectorIndex] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema migration and seeding happen once the server starts rather than
+    # at import time, so importing this module stays cheap
+    init_database()
+    # Backfills commit in small batches, so requests can be served meanwhile
+    threading.Thread(target=run_backfills, args=(engine,), daemon=True).start()
+    # Notes written while the server was down, or before the index existed,
+    # are embedded in the background
+    global note_index
+    note_index = VectorIndex(NOTE_INDEX_DIR, note_embedder.name)
+    threading.Thread(target=sync_note_index, daemon=True).start()
+    # Preload the model and keep it resident during active hours
+    model_keeper.start()
+    # Stale analyses and day summaries are refreshed during off-peak hours
+    precomputer.start()
+    yield
+    model_keeper.stop()
+    precomputer.stop()
+
+app = FastAPI(title="Flourish.ai API", lifespan=lifespan)
 
-app = FastAPI(title="Flourish.ai API")
-
-# Create tables on startup
-create_tables()
-init_default_data()
 
 origins = [
     "http://localhost:5173",
@@ -117,17 +163,29 @@ class AnalysisRequest(BaseModel):
     notes: List[HourNote]
     goals: str
     date: Optional[str] = None
+    # Return a quick draft now and refine it in the background
+    tiered: bool = False
+    # Generate a new analysis even if the stored one matches the notes and goals
+    refresh: bool = False
 
 class AnalysisResponse(BaseModel):
     analysis: str
     processing_time: float
     date: str
+    model_load_time: float = 0.0
+    truncated: bool = False  # cut off at the deadline; not stored
+    analysis_id: Optional[int] = None
+    version: Optional[int] = None  # goes up each time the stored analysis is replaced
+    tier: Optional[str] = None  # "full", or "draft" until refined to "refined"
+    cached: bool = False  # served from the stored analysis without calling the model
 
 class TimetableRequest(BaseModel):
     analysis: str
     goals: str
     date: str
     preferences: Optional[Dict[str, str]] = {}
+    # Ask the model to rewrite slot descriptions after the plan is built
+    enrich: bool = False
 
 class TimeSlot(BaseModel):
     hour: int
@@ -136,11 +194,32 @@ class TimeSlot(BaseModel):
     priority: str  # "high", "medium", "low"
     category: str  # "work", "study", "break", "personal", "exercise", etc.
 
+# Structured output schema for timetable enrichment. The model server only
+# lets the model produce JSON of this shape, so replies always parse.
+TIMETABLE_DESCRIPTIONS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "slots": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "hour": {"type": "integer", "minimum": 0, "maximum": 23},
+                    "description": {"type": "string"},
+                },
+                "required": ["hour", "description"],
+            },
+        },
+    },
+    "required": ["slots"],
+}
+
 class TimetableResponse(BaseModel):
     date: str
     schedule: List[TimeSlot]
     summary: str
     processing_time: float
+    enriched: bool = False
 
 class AnalyticsRequest(BaseModel):
     start_date: str
@@ -168,6 +247,7 @@ class AnalyticsResponse(BaseModel):
     trends: List[TrendData]
     insights: List[str]
     processing_time: float
+    fallback_used: bool = False
 
 class TemplateResponse(BaseModel):
     id: int
@@ -196,11 +276,39 @@ class SleepScheduleResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+# Reference data (tags, templates, goal categories, sleep schedule) rarely
+# changes, so serialized responses are cached until a write bumps the version
+reference_cache = ReferenceDataCache()
+REFERENCE_CACHE_CONTROL = "private, no-cache"
+
+def cached_reference_response(request: Request, resource: str, response_type, load, key=None) -> Response:
+    """Serve a reference resource from cache, answering 304 when the client copy is current"""
+    cached = reference_cache.get(resource, key)
+    if cached is None:
+        version = reference_cache.version(resource)
+        adapter = TypeAdapter(response_type)
+        body = adapter.dump_json(adapter.validate_python(load(), from_attributes=True))
+        cached = reference_cache.put(resource, key, version, body)
+
+    etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": REFERENCE_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Analytics results are cached until the notes, analyses or goals they were
+# computed from change. Note and analysis writes bump their date, goal writes
+# bump the "goals" scope.
+data_versions = DataVersions()
+analytics_cache = LRUCache(max_entries=128)
+
 # Sleep Schedule endpoints
 @app.get("/sleep-schedule", response_model=Optional[SleepScheduleResponse])
-def get_active_sleep_schedule(db: Session = Depends(get_db)):
-    schedule = db.query(SleepSchedule).filter(SleepSchedule.is_active == True).first()
-    return schedule
+def get_active_sleep_schedule(request: Request, db: Session = Depends(get_db)):
+    return cached_reference_response(
+        request, "sleep-schedule", Optional[SleepScheduleResponse],
+        lambda: db.query(SleepSchedule).filter(SleepSchedule.is_active == True).first()
+    )
 
 @app.post("/sleep-schedule", response_model=SleepScheduleResponse)
 def create_or_update_sleep_schedule(schedule: SleepScheduleCreate, db: Session = Depends(get_db)):
@@ -219,6 +327,7 @@ def create_or_update_sleep_schedule(schedule: SleepScheduleCreate, db: Session =
     
     db.add(db_schedule)
     db.commit()
+    reference_cache.invalidate("sleep-schedule")
     db.refresh(db_schedule)
     return db_schedule
 
@@ -234,6 +343,7 @@ def update_sleep_schedule(schedule_id: int, schedule: SleepScheduleUpdate, db: S
     
     db_schedule.updated_at = datetime.now()
     db.commit()
+    reference_cache.invalidate("sleep-schedule")
     db.refresh(db_schedule)
     return db_schedule
 
@@ -275,11 +385,29 @@ def apply_sleep_schedule_to_date(date: str, db: Session = Depends(get_db)):
         db.add(sleep_note)
     
     db.commit()
+    data_versions.bump_dates(date)
     return {"message": f"Applied sleep schedule to {date}", "sleep_hours": sleep_hours}
 
 # Notes endpoints
+def note_to_dict(note: Note) -> dict:
+    """Plain dict in the NoteResponse shape, ready for FastJSONResponse"""
+    return {
+        "id": note.id,
+        "date": note.date,
+        "hour": note.hour,
+        "content": note.content,
+        "rich_content": note.rich_content,
+        "tags": [tag.name for tag in note.tags],
+        "template_id": note.template_id,
+        "is_sleep": note.is_sleep,
+        "sleep_quality": note.sleep_quality,
+        "sleep_notes": note.sleep_notes or "",
+        "created_at": note.created_at,
+        "updated_at": note.updated_at
+    }
+
 @app.post("/notes", response_model=NoteResponse)
-def create_note(note: NoteCreate, db: Session = Depends(get_db)):
+def create_note(note: NoteCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     # Create the note
     db_note = Note(
         date=note.date,
@@ -301,31 +429,92 @@ def create_note(note: NoteCreate, db: Session = Depends(get_db)):
     
     db.add(db_note)
     db.commit()
+    data_versions.bump_dates(db_note.date)
     db.refresh(db_note)
-    
-    return NoteResponse(
-        id=db_note.id,
-        date=db_note.date,
-        hour=db_note.hour,
-        content=db_note.content,
-        rich_content=db_note.rich_content,
-        tags=[tag.name for tag in db_note.tags],
-        template_id=db_note.template_id,
-        is_sleep=db_note.is_sleep,
-        sleep_quality=db_note.sleep_quality,
-        sleep_notes=db_note.sleep_notes or "",
-        created_at=db_note.created_at,
-        updated_at=db_note.updated_at
-    )
+    background_tasks.add_task(index_note_ids, [db_note.id])
+    
+    return FastJSONResponse(note_to_dict(db_note))
+
+# Columns that can be requested from GET /notes via `fields=`; `snippet` is
+# cut in SQL so long entries never leave the database in full
+NOTE_SNIPPET_LENGTH = 120
+NOTE_COLUMNS = {
+    "id": Note.id,
+    "date": Note.date,
+    "hour": Note.hour,
+    "content": Note.content,
+    "snippet": func.substr(Note.content, 1, NOTE_SNIPPET_LENGTH),
+    "rich_content": Note.rich_content,
+    "template_id": Note.template_id,
+    "is_sleep": Note.is_sleep,
+    "sleep_quality": Note.sleep_quality,
+    "sleep_notes": Note.sleep_notes,
+    "created_at": Note.created_at,
+    "updated_at": Note.updated_at,
+}
+NOTE_FIELDS = list(NOTE_COLUMNS) + ["tags"]
+# rich_content (arbitrary JSON) and sleep_notes are only loaded when asked for
+DEFAULT_NOTE_LIST_FIELDS = [
+    "id", "date", "hour", "content", "tags", "template_id",
+    "is_sleep", "sleep_quality", "created_at", "updated_at"
+]
+TAG_LOOKUP_BATCH_SIZE = 500
+
+def parse_note_fields(fields: Optional[str]) -> List[str]:
+    """Turn a comma separated `fields` value into the list of note fields to load"""
+    if not fields:
+        return DEFAULT_NOTE_LIST_FIELDS
+    if fields.strip() == "*":
+        return NOTE_FIELDS
+
+    requested = []
+    for field in fields.split(","):
+        field = field.strip()
+        if not field:
+            continue
+        if field not in NOTE_FIELDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown field '{field}'. Available fields: {', '.join(NOTE_FIELDS)}"
+            )
+        if field not in requested:
+            requested.append(field)
+    return requested
+
+def load_note_tags(db: Session, note_ids: List[int]) -> Dict[int, List[str]]:
+    """Fetch tag names for many notes at once instead of one lazy load per note"""
+    tags_by_note = {note_id: [] for note_id in note_ids}
+    for offset in range(0, len(note_ids), TAG_LOOKUP_BATCH_SIZE):
+        batch = note_ids[offset:offset + TAG_LOOKUP_BATCH_SIZE]
+        rows = (
+            db.query(note_tags.c.note_id, Tag.name)
+            .join(Tag, Tag.id == note_tags.c.tag_id)
+            .filter(note_tags.c.note_id.in_(batch))
+            .order_by(note_tags.c.note_id, Tag.id)
+            .all()
+        )
+        for note_id, tag_name in rows:
+            tags_by_note[note_id].append(tag_name)
+    return tags_by_note
 
-@app.get("/notes", response_model=List[NoteResponse])
+@app.get("/notes")
 def get_notes(
     date: Optional[str] = Query(None),
     tag: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma separated note fields to return, or * for all. "
+                    "Defaults to everything except rich_content and sleep_notes."
+    ),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Note)
+    selected = parse_note_fields(fields)
+    column_names = [field for field in selected if field != "tags"]
+    # The id is always needed to attach tags, even if it is not returned
+    load_names = column_names if "id" in column_names or "tags" not in selected else column_names + ["id"]
+    
+    query = db.query(*[NOTE_COLUMNS[name].label(name) for name in load_names]).select_from(Note)
     
     if date:
         query = query.filter(Note.date == date)
@@ -336,25 +525,130 @@ def get_notes(
     if search:
         query = query.filter(Note.content.contains(search))
     
-    notes = query.order_by(Note.date.desc(), Note.hour.asc()).all()
+    rows = query.order_by(Note.date.desc(), Note.hour.asc()).all()
     
-    return [
-        NoteResponse(
-            id=note.id,
-            date=note.date,
-            hour=note.hour,
-            content=note.content,
-            rich_content=note.rich_content,
-            tags=[tag.name for tag in note.tags],
-            template_id=note.template_id,
-            is_sleep=note.is_sleep,
-            sleep_quality=note.sleep_quality,
-            sleep_notes=note.sleep_notes or "",
-            created_at=note.created_at,
-            updated_at=note.updated_at
+    tags_by_note = load_note_tags(db, [row.id for row in rows]) if "tags" in selected else {}
+    
+    # Project row tuples straight into dicts; a trailing id only loaded for
+    # the tag lookup is dropped by zip
+    notes = [dict(zip(column_names, row)) for row in rows]
+    
+    if "sleep_notes" in column_names:
+        for note in notes:
+            note["sleep_notes"] = note["sleep_notes"] or ""
+    
+    if "tags" in selected:
+        for note, row in zip(notes, rows):
+            note["tags"] = tags_by_note[row.id]
+    
+    return FastJSONResponse(notes)
+
+# Semantic search over note embeddings
+NOTE_INDEX_BATCH_SIZE = 256
+MAX_SEMANTIC_RESULTS = 100
+
+def index_notes(rows: List[tuple]):
+    """Embed (id, date, content) rows whose text changed since they were indexed"""
+    changed = []
+    empty = []
+    for note_id, note_date, content in rows:
+        text = (content or "").strip()
+        if not text:
+            empty.append(note_id)
+        elif note_index.digest(note_id) != text_digest(text):
+            changed.append((note_id, note_date, text))
+    if empty:
+        note_index.remove(empty)
+    if changed:
+        vectors = note_embedder.embed([text for _, _, text in changed])
+        note_index.upsert(
+            (note_id, vector, text_digest(text), day_number(note_date))
+            for (note_id, note_date, text), vector in zip(changed, vectors)
         )
-        for note in notes
+
+def index_note_ids(note_ids: List[int]):
+    """Background task: bring the index up to date with freshly written notes"""
+    db = SessionLocal()
+    try:
+        index_notes(db.query(Note.id, Note.date, Note.content).filter(Note.id.in_(note_ids)).all())
+    except Exception as e:
+        print(f"Indexing notes {note_ids} failed: {e}")
+    finally:
+        db.close()
+
+def sync_note_index():
+    """Embed every note the index is missing or has stale, and drop deleted ones"""
+    db = SessionLocal()
+    try:
+        seen = set()
+        batch = []
+        rows = db.query(Note.id, Note.date, Note.content).order_by(Note.id).yield_per(NOTE_INDEX_BATCH_SIZE)
+        for note_id, note_date, content in rows:
+            seen.add(note_id)
+            batch.append((note_id, note_date, content))
+            if len(batch) == NOTE_INDEX_BATCH_SIZE:
+                index_notes(batch)
+                batch = []
+        index_notes(batch)
+        note_index.remove([note_id for note_id in note_index.ids() if note_id not in seen])
+    except Exception as e:
+        print(f"Note index sync failed: {e}")
+    finally:
+        db.close()
+
+@app.get("/notes/semantic-search")
+def semantic_search_notes(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=MAX_SEMANTIC_RESULTS),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    mode: str = Query("auto", pattern="^(auto|exact|ivf)$"),
+    db: Session = Depends(get_db)
+):
+    """Notes closest in meaning to `q`, best first, with their cosine similarity"""
+    if note_index is None:
+        raise HTTPException(status_code=503, detail="Note index is not open yet")
+    first_day = day_number(start_date) if start_date else None
+    last_day = day_number(end_date) if end_date else None
+    if first_day == -1 or last_day == -1:
+        raise HTTPException(status_code=400, detail="Dates must use YYYY-MM-DD format")
+    start_time = time.time()
+    try:
+        query_vector = note_embedder.embed([q])[0]
+    except llm.CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=f"Semantic search unavailable: {str(e)}")
+    except llm.DeadlineExceeded:
+        raise HTTPException(status_code=504, detail="Embedding the query timed out")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Embedding the query failed: {str(e)}")
+
+    matches, used_mode = note_index.search(query_vector, limit, mode, first_day, last_day)
+
+    rows = {}
+    if matches:
+        rows = {
+            row.id: row for row in
+            db.query(Note.id, Note.date, Note.hour, Note.content).filter(Note.id.in_([m[0] for m in matches]))
+        }
+    tags_by_note = load_note_tags(db, list(rows))
+    results = [
+        {
+            "id": note_id,
+            "date": rows[note_id].date,
+            "hour": rows[note_id].hour,
+            "content": rows[note_id].content,
+            "tags": tags_by_note[note_id],
+            "score": round(score, 4),
+        }
+        for note_id, score in matches
+        if note_id in rows
     ]
+    return FastJSONResponse({
+        "results": results,
+        "mode": used_mode,
+        "indexed_notes": len(note_index),
+        "search_time": time.time() - start_time,
+    })
 
 @app.get("/notes/date/{date}")
 def get_notes_by_date(date: str, db: Session = Depends(get_db)):
@@ -391,8 +685,90 @@ def get_notes_by_date(date: str, db: Session = Depends(get_db)):
     
     return result
 
+MAX_GRID_DAYS = 366
+
+@app.get("/notes/grid")
+def get_notes_grid(
+    start: str = Query(...),
+    end: str = Query(...),
+    db: Session = Depends(get_db)
+):
+    """Return day x hour note grids for a date range in a columnar layout.
+
+    Only filled hours are sent. Each column is a parallel array indexed by
+    entry, `day` points into `dates` and `tags` holds indexes into `tag_names`.
+    """
+    try:
+        start_day = datetime.strptime(start, "%Y-%m-%d").date()
+        end_day = datetime.strptime(end, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must use YYYY-MM-DD format")
+
+    if end_day < start_day:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    day_count = (end_day - start_day).days + 1
+    if day_count > MAX_GRID_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_GRID_DAYS} days")
+
+    dates = [(start_day + timedelta(days=offset)).isoformat() for offset in range(day_count)]
+    day_index = {d: i for i, d in enumerate(dates)}
+
+    # One range scan over ix_notes_date_hour, tags folded in via outer join
+    rows = (
+        db.query(
+            Note.id, Note.date, Note.hour, Note.content, Note.template_id,
+            Note.is_sleep, Note.sleep_quality, Tag.name
+        )
+        .outerjoin(note_tags, note_tags.c.note_id == Note.id)
+        .outerjoin(Tag, Tag.id == note_tags.c.tag_id)
+        .filter(Note.date >= start, Note.date <= end)
+        .order_by(Note.date, Note.hour, Note.id)
+        .all()
+    )
+
+    columns = {
+        "day": [], "hour": [], "id": [], "content": [], "template_id": [],
+        "is_sleep": [], "sleep_quality": [], "tags": []
+    }
+    tag_names = []
+    tag_index = {}
+    last_id = None
+    day = None
+
+    for note_id, note_date, hour, content, template_id, is_sleep, sleep_quality, tag_name in rows:
+        if note_id != last_id:
+            last_id = note_id
+            # A date not stored as YYYY-MM-DD (e.g. "2025-6-3") can sort into
+            # the range as a string without being one of its days
+            day = day_index.get(note_date)
+            if day is None:
+                continue
+            columns["day"].append(day)
+            columns["hour"].append(hour)
+            columns["id"].append(note_id)
+            columns["content"].append(content or "")
+            columns["template_id"].append(template_id)
+            columns["is_sleep"].append(bool(is_sleep))
+            columns["sleep_quality"].append(sleep_quality)
+            columns["tags"].append([])
+        if tag_name is not None and day is not None:
+            if tag_name not in tag_index:
+                tag_index[tag_name] = len(tag_names)
+                tag_names.append(tag_name)
+            columns["tags"][-1].append(tag_index[tag_name])
+
+    return FastJSONResponse({
+        "start": dates[0],
+        "end": dates[-1],
+        "dates": dates,
+        "hours": 24,
+        "tag_names": tag_names,
+        "entries": columns
+    })
+
 @app.put("/notes/{note_id}", response_model=NoteResponse)
-def update_note(note_id: int, note: NoteCreate, db: Session = Depends(get_db)):
+def update_note(note_id: int, note: NoteCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     db_note = db.query(Note).filter(Note.id == note_id).first()
     if not db_note:
         raise HTTPException(status_code=404, detail="Note not found")
@@ -414,22 +790,11 @@ def update_note(note_id: int, note: NoteCreate, db: Session = Depends(get_db)):
                 db_note.tags.append(tag)
     
     db.commit()
+    data_versions.bump_dates(db_note.date)
     db.refresh(db_note)
+    background_tasks.add_task(index_note_ids, [db_note.id])
     
-    return NoteResponse(
-        id=db_note.id,
-        date=db_note.date,
-        hour=db_note.hour,
-        content=db_note.content,
-        rich_content=db_note.rich_content,
-        tags=[tag.name for tag in db_note.tags],
-        template_id=db_note.template_id,
-        is_sleep=db_note.is_sleep,
-        sleep_quality=db_note.sleep_quality,
-        sleep_notes=db_note.sleep_notes or "",
-        created_at=db_note.created_at,
-        updated_at=db_note.updated_at
-    )
+    return FastJSONResponse(note_to_dict(db_note))
 
 # Goals endpoints
 @app.post("/goals", response_model=GoalResponse)
@@ -437,6 +802,7 @@ def create_goal(goal: GoalCreate, db: Session = Depends(get_db)):
     db_goal = Goal(**goal.dict())
     db.add(db_goal)
     db.commit()
+    data_versions.bump_scope("goals")
     db.refresh(db_goal)
     return db_goal
 
@@ -468,6 +834,7 @@ def update_goal(goal_id: int, goal: GoalUpdate, db: Session = Depends(get_db)):
     
     db_goal.updated_at = datetime.now()
     db.commit()
+    data_versions.bump_scope("goals")
     db.refresh(db_goal)
     return db_goal
 
@@ -512,6 +879,7 @@ def delete_goal(goal_id: int, db: Session = Depends(get_db)):
     db.query(Milestone).filter(Milestone.goal_id == goal_id).delete()
     db.delete(goal)
     db.commit()
+    data_versions.bump_scope("goals")
     return {"message": "Goal deleted successfully"}
 
 # Milestone endpoints
@@ -594,6 +962,7 @@ def update_goal_progress(goal_id: int, db: Session):
         goal.status = 'active'  # Reopen if progress drops below 100%
     
     db.commit()
+    data_versions.bump_scope("goals")
 
 # Update the existing goals endpoint to include milestones
 @app.get("/goals-with-milestones", response_model=List[dict])
@@ -674,8 +1043,11 @@ class GoalCategoryResponse(BaseModel):
 
 # Goal Category endpoints
 @app.get("/goal-categories", response_model=List[GoalCategoryResponse])
-def get_goal_categories(db: Session = Depends(get_db)):
-    return db.query(GoalCategory).order_by(GoalCategory.is_default.desc(), GoalCategory.name.asc()).all()
+def get_goal_categories(request: Request, db: Session = Depends(get_db)):
+    return cached_reference_response(
+        request, "goal-categories", List[GoalCategoryResponse],
+        lambda: db.query(GoalCategory).order_by(GoalCategory.is_default.desc(), GoalCategory.name.asc()).all()
+    )
 
 @app.post("/goal-categories", response_model=GoalCategoryResponse)
 def create_goal_category(category: GoalCategoryCreate, db: Session = Depends(get_db)):
@@ -687,6 +1059,7 @@ def create_goal_category(category: GoalCategoryCreate, db: Session = Depends(get
     db_category = GoalCategory(**category.dict(), is_default=False)
     db.add(db_category)
     db.commit()
+    reference_cache.invalidate("goal-categories")
     db.refresh(db_category)
     return db_category
 
@@ -715,6 +1088,7 @@ def update_goal_category(category_id: int, category: GoalCategoryUpdate, db: Ses
     
     db_category.updated_at = datetime.now()
     db.commit()
+    reference_cache.invalidate("goal-categories")
     db.refresh(db_category)
     return db_category
 
@@ -738,55 +1112,46 @@ def delete_goal_category(category_id: int, db: Session = Depends(get_db)):
     
     db.delete(category)
     db.commit()
+    reference_cache.invalidate("goal-categories")
     return {"message": "Goal category deleted successfully"}
 
 # Tags endpoints
 @app.get("/tags", response_model=List[TagResponse])
-def get_tags(db: Session = Depends(get_db)):
-    return db.query(Tag).order_by(Tag.name).all()
+def get_tags(request: Request, db: Session = Depends(get_db)):
+    return cached_reference_response(
+        request, "tags", List[TagResponse],
+        lambda: db.query(Tag).order_by(Tag.name).all()
+    )
 
 @app.post("/tags", response_model=TagResponse)
 def create_tag(tag: TagCreate, db: Session = Depends(get_db)):
     db_tag = Tag(**tag.dict())
     db.add(db_tag)
     db.commit()
+    reference_cache.invalidate("tags")
     db.refresh(db_tag)
     return db_tag
 
 # Templates endpoints
 @app.get("/templates", response_model=List[TemplateResponse])
-def get_templates(category: Optional[str] = Query(None), db: Session = Depends(get_db)):
-    query = db.query(NoteTemplate)
-    
-    if category:
-        query = query.filter(NoteTemplate.category == category)
-    
-    return query.order_by(NoteTemplate.name).all()
-
-# Analysis endpoint with caching
-@app.post("/analyze", response_model=AnalysisResponse)
-def analyze(request: AnalysisRequest, db: Session = Depends(get_db)):
-    start_time = time.time()
-    
-    analysis_date = request.date or datetime.now().strftime("%Y-%m-%d")
-    
-    # Check if we have a recent analysis for today
-    existing_analysis = db.query(Analysis).filter(
-        Analysis.date == analysis_date
-    ).order_by(Analysis.created_at.desc()).first()
+def get_templates(request: Request, category: Optional[str] = Query(None), db: Session = Depends(get_db)):
+    def load():
+        query = db.query(NoteTemplate)
+        
+        if category:
+            query = query.filter(NoteTemplate.category == category)
+        
+        return query.order_by(NoteTemplate.name).all()
     
-    # Filter out empty notes and format them for the prompt
-    formatted_notes = "\n".join(
-        f"- {hour.time}:00: {hour.note}"
-        for hour in request.notes if hour.note.strip()
-    )
+    return cached_reference_response(request, "templates", List[TemplateResponse], load, key=category)
 
-    # Enhanced prompt with more context
-    prompt = f"""
-    You are an AI personal growth and life optimization coach. The user has provided their notes on an hourly basis.
-    Analyze the following hourly notes and overall goals to provide insights into the user's
+# Fixed instructions for /analyze, sent as the system message ahead of the
+# day's notes so the model server can reuse their evaluation between calls
+ANALYZE_SYSTEM_PROMPT = normalize_whitespace("""
+    You are an AI personal growth and life optimization coach. The user provides their notes on an hourly basis.
+    Analyze the hourly notes and overall goals to provide insights into the user's
     personal development, productivity, and progress. Identify patterns, optimization opportunities, and growth areas.
-    
+
     Please structure your response with:
     1. **Daily Summary**: Overview of the day's activities and productivity
     2. **Key Patterns**: Notable patterns in thoughts, activities, or behaviors
@@ -795,229 +1160,564 @@ def analyze(request: AnalysisRequest, db: Session = Depends(get_db)):
     5. **Goal Progress**: Assessment of progress toward stated goals
     6. **Optimization Recommendations**: Specific, actionable suggestions for tomorrow
 
-    Hourly Notes:
-    {formatted_notes}
+    Related notes from earlier days and summaries of previous analyses may come before the day's notes.
+    Use them only to spot long-term patterns and progress; the analysis is about the current day.
+""")
+
+# Instructions for the fast first tier of a tiered analysis
+ANALYZE_DRAFT_SYSTEM_PROMPT = normalize_whitespace("""
+    You are a personal growth coach. From the user's hourly notes and goals, write a quick first-pass analysis:
+    3-5 short bullet points on what the day looked like, progress toward the goals and one suggestion for tomorrow.
+""")
+
+def analysis_context(db: Session, request: AnalysisRequest, analysis_date: str) -> RetrievedContext:
+    """Past notes and earlier analyses related to the day's notes and goals"""
+    query = "\n".join([hour.note for hour in request.notes if hour.note.strip()] + [request.goals])
+    return retrieve_context(db, note_index, note_embedder, query, analysis_date)
+
+def analysis_prompt(route: str, system: str, request: AnalysisRequest,
+                    context: Optional[RetrievedContext] = None) -> str:
+    # Filter out empty notes; when the day does not fit the context budget,
+    # the notes most related to the goals are kept
+    filled_notes = [hour for hour in request.notes if hour.note.strip()]
+    note_lines = [f"- {hour.time}:00: {hour.note}" for hour in filled_notes]
+
+    # Only the day's notes and goals vary; the instructions go in the system message
+    builder = PromptBuilder(route, system=system)
+    # Retrieved context has a fixed budget of its own, so the prompt does not
+    # grow with the journal and the day's notes keep the rest
+    if context is not None and context.notes:
+        builder.section(
+            "Related Notes From Earlier Days:",
+            [f"- {note.date} {note.hour}:00: {note.content}" for note in context.notes],
+            scores=[note.score for note in context.notes],
+            max_item_tokens=80, max_tokens=RETRIEVAL_TOKENS * 3 // 5
+        )
+    if context is not None and context.analyses:
+        builder.section(
+            "Previous Analyses:",
+            [f"- {analysis.date}: {analysis.summary}" for analysis in context.analyses],
+            scores=[analysis.score for analysis in context.analyses],
+            max_item_tokens=80, max_tokens=RETRIEVAL_TOKENS * 2 // 5
+        )
+    return (
+        builder
+        .section(
+            "Hourly Notes:", note_lines,
+            scores=relevance_scores([hour.note for hour in filled_notes], request.goals),
+            max_item_tokens=200
+        )
+        .text(f"Today's Goals:\n{request.goals}", max_tokens=400)
+        .text("Analysis:")
+        .build()
+    )
 
-    Today's Goals:
-    {request.goals}
+def draft_from_notes(notes: List[HourNote], goals: str) -> str:
+    """Rule-based first look at a day, for when the fast model gives nothing"""
+    filled = sorted((hour for hour in notes if hour.note.strip()), key=lambda hour: hour.time)
+    if not filled:
+        return "**Draft analysis**\n- No notes were logged for this day yet."
 
-    Analysis:
-    """
+    lines = [
+        "**Draft analysis** (a detailed analysis is on its way)",
+        f"- Logged {len(filled)} hours between {filled[0].time}:00 and {filled[-1].time + 1}:00."
+    ]
+    scores = relevance_scores([hour.note for hour in filled], goals)
+    goal_hours = [hour.time for hour, score in zip(filled, scores) if score >= 1]
+    if goal_hours:
+        lines.append(f"- Notes related to your goals: {', '.join(f'{h}:00' for h in goal_hours[:6])}.")
+    else:
+        lines.append("- None of the notes mention your goals directly; consider blocking time for them tomorrow.")
+    periods = {"morning": 0, "afternoon": 0, "evening": 0}
+    for hour in filled:
+        periods["morning" if hour.time < 12 else "afternoon" if hour.time < 17 else "evening"] += 1
+    lines.append(f"- Most of your notes are from the {max(periods, key=periods.get)}.")
+    return "\n".join(lines)
+
+def apply_analysis(row: Analysis, request: AnalysisRequest, text: str, model_used: str,
+                   processing_time: float, model_load_time: float, tier: str):
+    """Write a new analysis text into `row`, bumping its version"""
+    row.notes_content = [note.dict() for note in request.notes]
+    row.goals_content = request.goals
+    row.ai_response = text
+    row.summary = create_summary(text)
+    row.word_count = count_words(text)
+    row.model_used = model_used
+    row.processing_time = processing_time
+    row.model_load_time = model_load_time
+    row.tier = tier
+    row.version = (row.version or 0) + 1
+    row.created_at = datetime.now()
+
+def save_analysis(db: Session, analysis_date: str, request: AnalysisRequest, text: str, model_used: str,
+                  processing_time: float, model_load_time: float, tier: str) -> Analysis:
+    """Store the analysis of a date, replacing the previous one"""
+    row = db.query(Analysis).filter(
+        Analysis.date == analysis_date
+    ).order_by(Analysis.created_at.desc()).first()
+    if row is None:
+        row = Analysis(date=analysis_date)
+        db.add(row)
+    apply_analysis(row, request, text, model_used, processing_time, model_load_time, tier)
+    db.commit()
+    data_versions.bump_dates(analysis_date)
+    return row
+
+def note_pairs(notes: List[dict]) -> List[tuple]:
+    """The filled (hour, text) pairs of a day's notes, for comparing analyses"""
+    return sorted(
+        (note["time"], note["note"].strip())
+        for note in notes
+        if (note.get("note") or "").strip()
+    )
+
+def is_current(row: Analysis, notes: List[HourNote], goals: Optional[str] = None) -> bool:
+    """Whether a stored analysis was made from these notes (and goals, if given)"""
+    if note_pairs(row.notes_content or []) != note_pairs([note.dict() for note in notes]):
+        return False
+    return goals is None or (row.goals_content or "").strip() == goals.strip()
+
+def is_complete(row: Analysis) -> bool:
+    """Whether a stored analysis is final: a draft still awaits (or lost) its refinement"""
+    return row.tier in ("full", "refined")
+
+def latest_analyses(db: Session, start_date: str, end_date: str) -> Dict[str, Analysis]:
+    rows = (
+        db.query(Analysis)
+        .filter(Analysis.date >= start_date, Analysis.date <= end_date)
+        .order_by(Analysis.date, Analysis.created_at)
+    )
+    # The latest analysis of each date wins
+    return {row.date: row for row in rows}
+
+def refine_analysis(analysis_id: int, draft_version: int, request: AnalysisRequest, analysis_date: str):
+    """Second tier: replace a draft with the full analysis from the stronger model.
 
+    Retrieval of earlier context happens here too, so the draft never waits for it.
+    """
+    start_time = time.time()
+    db = SessionLocal()
     try:
-        response = ollama.chat(model='phi3:mini', messages=[
-            {
-                'role': 'user',
-                'content': prompt,
-            },
-        ])
+        context = analysis_context(db, request, analysis_date)
+    finally:
+        db.close()
+    try:
+        reply = llm.chat_reply(
+            analysis_prompt("analyze", ANALYZE_SYSTEM_PROMPT, request, context), "analyze",
+            system=ANALYZE_SYSTEM_PROMPT
+        )
+    except Exception as e:
+        print(f"Analysis refinement failed: {e}")
+        return
+    # The draft stays if the full analysis did not finish
+    if reply.truncated or not reply.text.strip():
+        return
 
-        ai_response = response['message']['content']
-        processing_time = time.time() - start_time
-        
-        # Update existing analysis or create new one
-        if existing_analysis:
-            # Update the existing analysis for this date
-            existing_analysis.notes_content = [note.dict() for note in request.notes]
-            existing_analysis.goals_content = request.goals
-            existing_analysis.ai_response = ai_response
-            existing_analysis.model_used = "phi3:mini"
-            existing_analysis.processing_time = processing_time
-            existing_analysis.created_at = datetime.now()  # Update timestamp
-            db_analysis = existing_analysis
-        else:
-            # Create new analysis
-            db_analysis = Analysis(
-                date=analysis_date,
-                notes_content=[note.dict() for note in request.notes],
-                goals_content=request.goals,
-                ai_response=ai_response,
-                model_used="phi3:mini",
-                processing_time=processing_time
-            )
-            db.add(db_analysis)
-        
+    model_load_time = llm.load_seconds(reply.stats)
+    db = SessionLocal()
+    try:
+        row = db.get(Analysis, analysis_id)
+        # Another analysis of the day replaced the draft meanwhile
+        if row is None or row.version != draft_version:
+            return
+        apply_analysis(
+            row, request, reply.text, model_registry.route("analyze").model,
+            max(0.0, time.time() - start_time - model_load_time), model_load_time, "refined"
+        )
         db.commit()
-        
+        data_versions.bump_dates(row.date)
+    finally:
+        db.close()
+
+def analyze_tiered(request: AnalysisRequest, analysis_date: str, background_tasks: BackgroundTasks,
+                   db: Session, start_time: float) -> AnalysisResponse:
+    """Answer at once with a draft from the fast tier; refine it in the background"""
+    text, model_used, model_load_time = "", "rules", 0.0
+    try:
+        reply = llm.chat_reply(
+            analysis_prompt("analyze_draft", ANALYZE_DRAFT_SYSTEM_PROMPT, request), "analyze_draft",
+            system=ANALYZE_DRAFT_SYSTEM_PROMPT
+        )
+        # Even a draft cut off at its deadline is a useful first answer
+        text = reply.text.strip()
+        model_used = model_registry.route("analyze_draft").model
+        model_load_time = llm.load_seconds(reply.stats)
+    except Exception as e:
+        print(f"Draft analysis failed: {e}")
+    if not text:
+        text, model_used, model_load_time = draft_from_notes(request.notes, request.goals), "rules", 0.0
+
+    processing_time = max(0.0, time.time() - start_time - model_load_time)
+    row = save_analysis(db, analysis_date, request, text, model_used, processing_time, model_load_time, "draft")
+    background_tasks.add_task(refine_analysis, row.id, row.version, request, analysis_date)
+    return AnalysisResponse(
+        analysis=text,
+        processing_time=processing_time,
+        date=analysis_date,
+        model_load_time=model_load_time,
+        analysis_id=row.id,
+        version=row.version,
+        tier=row.tier
+    )
+
+def generate_analysis(request: AnalysisRequest, analysis_date: str, db: Session, start_time: float) -> AnalysisResponse:
+    """Full analysis of one day with the analyze route, stored unless cut off"""
+    context = analysis_context(db, request, analysis_date)
+    reply = llm.chat_reply(
+        analysis_prompt("analyze", ANALYZE_SYSTEM_PROMPT, request, context), "analyze",
+        system=ANALYZE_SYSTEM_PROMPT
+    )
+    model_used = model_registry.route("analyze").model
+    ai_response = reply.text
+    # A cold model's load time is reported on its own, not as analysis time
+    model_load_time = llm.load_seconds(reply.stats)
+    processing_time = max(0.0, time.time() - start_time - model_load_time)
+    
+    if reply.truncated:
+        if not ai_response.strip():
+            raise HTTPException(status_code=504, detail="Analysis timed out before any text was generated")
+        # Cut off at the deadline: returned as is but not stored, so the
+        # next request for this date generates a complete analysis
         return AnalysisResponse(
             analysis=ai_response,
             processing_time=processing_time,
-            date=analysis_date
+            date=analysis_date,
+            truncated=True
+        )
+    
+    db_analysis = save_analysis(
+        db, analysis_date, request, ai_response, model_used, processing_time, model_load_time, "full"
+    )
+    
+    return AnalysisResponse(
+        analysis=ai_response,
+        processing_time=processing_time,
+        date=analysis_date,
+        model_load_time=model_load_time,
+        analysis_id=db_analysis.id,
+        version=db_analysis.version,
+        tier=db_analysis.tier
+    )
+
+# Analysis endpoint with caching
+@app.post("/analyze", response_model=AnalysisResponse)
+def analyze(request: AnalysisRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    start_time = time.time()
+    
+    analysis_date = request.date or datetime.now().strftime("%Y-%m-%d")
+
+    # Analyses precomputed off-peak (or asked for before) are served as they are
+    stored = latest_analyses(db, analysis_date, analysis_date).get(analysis_date)
+    if (not request.refresh and stored is not None and is_complete(stored)
+            and is_current(stored, request.notes, request.goals)):
+        return AnalysisResponse(
+            analysis=stored.ai_response,
+            processing_time=time.time() - start_time,
+            date=analysis_date,
+            analysis_id=stored.id,
+            version=stored.version,
+            tier=stored.tier,
+            cached=True
         )
+
+    try:
+        if request.tiered:
+            return analyze_tiered(request, analysis_date, background_tasks, db, start_time)
+        return generate_analysis(request, analysis_date, db, start_time)
         
+    except HTTPException:
+        raise
+    except llm.CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=f"Analysis unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+# Batch analysis of stored days
+MAX_BATCH_DAYS = 366
+batch_jobs = JobRegistry()
+
+class BatchAnalysisRequest(BaseModel):
+    start_date: str
+    end_date: str
+    # Defaults to the active goals
+    goals: Optional[str] = None
+    # Re-analyze dates whose analysis is already up to date
+    force: bool = False
+
+def stored_day_notes(db: Session, start_date: str, end_date: str) -> Dict[str, List[HourNote]]:
+    """Filled hours of each day in the range, as /analyze receives them"""
+    rows = (
+        db.query(Note.date, Note.hour, Note.content)
+        .filter(Note.date >= start_date, Note.date <= end_date)
+        .order_by(Note.date, Note.hour)
+    )
+    days: Dict[str, List[HourNote]] = {}
+    for note_date, hour, content in rows:
+        if content and content.strip():
+            days.setdefault(note_date, []).append(HourNote(time=hour, note=content))
+    return days
+
+def active_goals_text(db: Session) -> str:
+    goals = db.query(Goal.title, Goal.description).filter(Goal.status == 'active').all()
+    if not goals:
+        return ""
+    return "Active Goals:\n" + "\n".join(f"{title}: {description or ''}" for title, description in goals)
+
+def analyze_stored_day(day: str, notes: List[HourNote], goals: str):
+    """Batch worker: analyze one day and store it, with a session of its own"""
+    db = SessionLocal()
+    try:
+        result = generate_analysis(AnalysisRequest(notes=notes, goals=goals, date=day), day, db, time.time())
+    except HTTPException as e:
+        return "truncated" if e.status_code == 504 else "failed", e.detail
+    finally:
+        db.close()
+    if result.truncated:
+        return "truncated", "Cut off at the deadline; not stored"
+    return "done", None
+
+@app.post("/analyze/batch", status_code=202)
+def analyze_batch(request: BatchAnalysisRequest, db: Session = Depends(get_db)):
+    """Analyze every day with notes in a date range, in the background.
+
+    Days whose latest analysis is complete (not a draft) and was made from
+    exactly the notes stored now are skipped unless `force` is set. Poll GET /analyze/batch/{job_id} for progress.
+    """
+    try:
+        start = datetime.strptime(request.start_date, "%Y-%m-%d")
+        end = datetime.strptime(request.end_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must use YYYY-MM-DD")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end_date is before start_date")
+    if (end - start).days + 1 > MAX_BATCH_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_BATCH_DAYS} days")
+
+    notes_by_day = stored_day_notes(db, request.start_date, request.end_date)
+    stored = {} if request.force else latest_analyses(db, request.start_date, request.end_date)
+
+    items = []
+    for day, notes in notes_by_day.items():
+        up_to_date = day in stored and is_complete(stored[day]) and is_current(stored[day], notes)
+        items.append((day, "skipped" if up_to_date else "pending"))
+
+    goals = request.goals if request.goals is not None else active_goals_text(db)
+    job = BatchJob("analyze", items)
+    batch_jobs.start(job, lambda day: analyze_stored_day(day, notes_by_day[day], goals), llm.LLM_PARALLELISM)
+    return job.snapshot()
+
+@app.get("/analyze/batch/{job_id}")
+def get_analyze_batch(job_id: str):
+    job = batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job.snapshot()
+
+# Off-peak precomputation of analyses and day summaries
+def precompute_range() -> AnalyticsRequest:
+    """The completed days kept fresh: the lookback window up to yesterday"""
+    today = datetime.now()
+    return AnalyticsRequest(
+        start_date=(today - timedelta(days=PRECOMPUTE_LOOKBACK_DAYS)).strftime("%Y-%m-%d"),
+        end_date=(today - timedelta(days=1)).strftime("%Y-%m-%d"),
+        analysis_type="patterns"
+    )
+
+def stale_analysis_dates() -> List[str]:
+    """Completed days with notes but no analysis, a draft, or one made from older notes"""
+    window = precompute_range()
+    db = SessionLocal()
+    try:
+        notes_by_day = stored_day_notes(db, window.start_date, window.end_date)
+        stored = latest_analyses(db, window.start_date, window.end_date)
+    finally:
+        db.close()
+    return [
+        day for day, notes in notes_by_day.items()
+        if day not in stored or not is_complete(stored[day]) or not is_current(stored[day], notes)
+    ]
+
+def precompute_analysis(day: str):
+    db = SessionLocal()
+    try:
+        notes = stored_day_notes(db, day, day).get(day, [])
+        stored = latest_analyses(db, day, day).get(day)
+        # Keep the reflection the day was last analyzed with
+        goals = stored.goals_content if stored is not None and stored.goals_content else active_goals_text(db)
+    finally:
+        db.close()
+    if notes:
+        status, detail = analyze_stored_day(day, notes, goals)
+        if status != "done":
+            raise RuntimeError(detail)
+
+def stale_summary_days() -> List[str]:
+    db = SessionLocal()
+    try:
+        return stale_days(db, group_daily_activities(stream_notes_with_tags(db, precompute_range())))
+    finally:
+        db.close()
+
+def precompute_day_summary(day: str):
+    db = SessionLocal()
+    try:
+        window = AnalyticsRequest(start_date=day, end_date=day, analysis_type="patterns")
+        summarize_days(SummaryStore(db), group_daily_activities(stream_notes_with_tags(db, window)))
+    finally:
+        db.close()
+
+precomputer = Precomputer([
+    PrecomputeTask("day_summaries", stale_summary_days, precompute_day_summary),
+    PrecomputeTask("analyses", stale_analysis_dates, precompute_analysis),
+])
+
 # Timetable generation endpoint
+TIMETABLE_HISTORY_DAYS = 14
+
+def load_recent_notes(db: Session, day: datetime, days: int) -> List[RecentNote]:
+    """Notes (hour, content, tags) from the `days` days before `day`"""
+    window = AnalyticsRequest(
+        start_date=(day - timedelta(days=days)).strftime("%Y-%m-%d"),
+        end_date=(day - timedelta(days=1)).strftime("%Y-%m-%d"),
+        analysis_type="patterns"
+    )
+    return [RecentNote(note.hour, note.content, note.tags) for note in stream_notes_with_tags(db, window)]
+
+def enrich_timetable(schedule: List[TimeSlot], request: TimetableRequest) -> bool:
+    """Let the model rewrite slot descriptions; the plan itself stays as built.
+
+    Descriptions are applied as each one streams in, so a failed or cut-off
+    generation leaves the remaining slots with their built-in descriptions.
+    """
+    slots_by_hour = {slot.hour: slot for slot in schedule}
+    prompt = (
+        PromptBuilder("generate_timetable")
+        .text(f"Here is the plan for {request.date}. Write a specific, actionable one-sentence description for each time slot, based on the analysis and goals below. Do not change the hours or activities.")
+        .text(f"ANALYSIS FROM TODAY:\n{request.analysis}", max_tokens=1200)
+        .text(f"CURRENT GOALS:\n{request.goals}", max_tokens=400)
+        .section("PLAN:", [f"{slot.hour}:00 - {slot.activity} ({slot.category})" for slot in schedule])
+        .text('Respond with a JSON object whose "slots" array holds {"hour", "description"} for every slot.')
+        .build()
+    )
+
+    enriched = False
+    parser = ArrayItemParser()
+    try:
+        for chunk in llm.chat_stream(prompt, "generate_timetable", schema=TIMETABLE_DESCRIPTIONS_SCHEMA):
+            for item in parser.feed(chunk):
+                slot = slots_by_hour.get(item.get("hour"))
+                description = item.get("description")
+                if slot is not None and isinstance(description, str) and description.strip():
+                    slot.description = description.strip()
+                    enriched = True
+    except Exception as e:
+        print(f"Timetable enrichment interrupted: {e}")
+    return enriched
+
 @app.post("/generate-timetable", response_model=TimetableResponse)
 def generate_timetable(request: TimetableRequest, db: Session = Depends(get_db)):
     start_time = time.time()
     
     try:
         # Parse preferences with defaults
-        wake_time = int(request.preferences.get("wake_time", "7"))
-        sleep_time = int(request.preferences.get("sleep_time", "23"))
-        focus_hours = int(request.preferences.get("focus_hours", "4"))
-        break_frequency = int(request.preferences.get("break_frequency", "90"))  # minutes
-        
-        prompt = f"""
-        Based on the following analysis and goals, create an optimized hour-by-hour schedule for tomorrow ({request.date}).
-        
-        ANALYSIS FROM TODAY:
-        {request.analysis}
-        
-        CURRENT GOALS:
-        {request.goals}
-        
-        PREFERENCES:
-        - Wake up time: {wake_time}:00
-        - Sleep time: {sleep_time}:00
-        - Focus work blocks: {focus_hours} hours total
-        - Break every: {break_frequency} minutes
-        
-        Create a JSON response with the following structure for each hour from {wake_time} to {sleep_time}:
-        {{
-            "hour": [hour number 0-23],
-            "activity": "[short activity name]",
-            "description": "[detailed description with specific actions]",
-            "priority": "[high/medium/low]",
-            "category": "[work/study/break/personal/exercise/meal/leisure]"
-        }}
+        preferences = DayPreferences(
+            wake_time=int(request.preferences.get("wake_time", "7")),
+            sleep_time=int(request.preferences.get("sleep_time", "23")),
+            focus_hours=int(request.preferences.get("focus_hours", "4")),
+            break_frequency=int(request.preferences.get("break_frequency", "90"))  # minutes
+        )
+        try:
+            day = datetime.strptime(request.date, "%Y-%m-%d")
+        except ValueError:
+            day = datetime.now()
         
-        GUIDELINES:
-        1. Based on the analysis, prioritize areas that need improvement (like DSA study if that was identified as lacking)
-        2. Include focused work/study blocks for skill development
-        3. Add regular breaks to prevent burnout
-        4. Balance productivity with self-care
-        5. Include time for meals and personal activities
-        6. Make it realistic and achievable
-        7. Address specific issues mentioned in the analysis
+        # The plan is built deterministically from tracked goals (or the goals
+        # text when none are tracked) and the last two weeks of notes
+        recent_notes = load_recent_notes(db, day, TIMETABLE_HISTORY_DAYS)
+        active_goals = db.query(Goal.title, Goal.category, Goal.target_date, Goal.progress).filter(
+            Goal.status == 'active'
+        ).all()
+        demands = (
+            goal_demands(active_goals, recent_notes, day.date(), request.analysis)
+            or text_goal_demands(request.goals)
+        )
+        schedule = [
+            TimeSlot(**slot)
+            for slot in build_schedule(preferences, demands, focus_scores(recent_notes, TIMETABLE_HISTORY_DAYS))
+        ]
         
-        Provide ONLY a valid JSON array of time slots, no additional text.
-        """
-
-        response = ollama.chat(model='phi3:mini', messages=[
-            {
-                'role': 'user',
-                'content': prompt,
-            },
-        ])
-
-        ai_response = response['message']['content']
+        enriched = request.enrich and enrich_timetable(schedule, request)
         processing_time = time.time() - start_time
         
-        # Try to parse the JSON response
-        try:
-            import json
-            import re
-            
-            # Extract JSON from response if it contains other text
-            json_match = re.search(r'\[.*\]', ai_response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-            else:
-                json_str = ai_response
-            
-            schedule_data = json.loads(json_str)
-            
-            # Validate and convert to TimeSlot objects
-            schedule = []
-            for slot in schedule_data:
-                if isinstance(slot, dict) and all(k in slot for k in ['hour', 'activity', 'description', 'priority', 'category']):
-                    schedule.append(TimeSlot(**slot))
-            
-            if not schedule:
-                raise ValueError("No valid time slots found")
-                
-        except (json.JSONDecodeError, ValueError) as e:
-            # Fallback to generated schedule if AI response is malformed
-            schedule = generate_fallback_schedule(wake_time, sleep_time, focus_hours, request.analysis)
-        
-        # Generate summary
-        summary = f"Optimized schedule for {request.date} with {len(schedule)} time blocks, focusing on areas identified in your analysis."
+        goal_titles = {demand.title for demand in demands}
+        focus_goals = list(dict.fromkeys(slot.activity for slot in schedule if slot.activity in goal_titles))
+        summary = f"Optimized schedule for {request.date} with {len(schedule)} time blocks"
+        summary += f", focusing on {', '.join(focus_goals[:3])}." if focus_goals else "."
         
         return TimetableResponse(
             date=request.date,
             schedule=schedule,
             summary=summary,
-            processing_time=processing_time
+            processing_time=processing_time,
+            enriched=enriched
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Timetable generation failed: {str(e)}")
 
-def generate_fallback_schedule(wake_time: int, sleep_time: int, focus_hours: int, analysis: str) -> List[TimeSlot]:
-    """Generate a basic fallback schedule if AI parsing fails"""
-    schedule = []
-    current_hour = wake_time
-    
-    # Morning routine
-    schedule.append(TimeSlot(
-        hour=current_hour,
-        activity="Morning Routine",
-        description="Wake up, hygiene, light breakfast, prepare for the day",
-        priority="medium",
-        category="personal"
-    ))
-    current_hour += 1
-    
-    # Study/work blocks based on analysis
-    if "DSA" in analysis or "Data Structures" in analysis:
-        for i in range(focus_hours):
-            if current_hour < sleep_time - 2:
-                schedule.append(TimeSlot(
-                    hour=current_hour,
-                    activity="DSA Study",
-                    description="Focused study on Data Structures and Algorithms - practice problems and concepts",
-                    priority="high",
-                    category="study"
-                ))
-                current_hour += 1
-                
-                # Add break after study
-                if i < focus_hours - 1 and current_hour < sleep_time - 1:
-                    schedule.append(TimeSlot(
-                        hour=current_hour,
-                        activity="Break",
-                        description="Rest, hydration, light movement",
-                        priority="medium",
-                        category="break"
-                    ))
-                    current_hour += 1
-    
-    # Fill remaining hours with balanced activities
-    while current_hour < sleep_time:
-        if current_hour == 12 or current_hour == 18:  # Meal times
-            meal = "Lunch" if current_hour == 12 else "Dinner"
-            schedule.append(TimeSlot(
-                hour=current_hour,
-                activity=meal,
-                description=f"Healthy {meal.lower()} and brief relaxation",
-                priority="medium",
-                category="meal"
-            ))
-        elif current_hour > 20:  # Evening
-            schedule.append(TimeSlot(
-                hour=current_hour,
-                activity="Evening Routine",
-                description="Wind down, reflect on day, prepare for tomorrow",
-                priority="low",
-                category="personal"
-            ))
-        else:
-            schedule.append(TimeSlot(
-                hour=current_hour,
-                activity="Productive Work",
-                description="Continue with important tasks and skill development",
-                priority="medium",
-                category="work"
-            ))
-        current_hour += 1
-    
-    return schedule
-
 # Add AI generation for SMART goal fields after the analyze endpoint
 
+SMART_SYSTEM_PROMPT = (
+    "You help the user write SMART goals. Reply with the requested field only, "
+    "as plain text in one short paragraph, without repeating the goal or the instructions."
+)
+
+# Per field: (instructions, example, answer label). Together with
+# SMART_SYSTEM_PROMPT they form a fixed system message per field type; only
+# the goal details after them change between requests.
+SMART_FIELD_INSTRUCTIONS = {
+    "description": (
+        "Write a clear, motivating 2-3 sentence description for this goal. Focus on why this goal matters and what achieving it would mean. Keep it inspiring but realistic.",
+        'Example format: "This goal focuses on [specific area] to help me [benefit/outcome]. By achieving this, I will [impact on life/career/wellbeing]. This aligns with my desire to [bigger picture/values]."',
+        "Description"
+    ),
+    "specific": (
+        "Make this goal specific and clear. Define exactly what will be accomplished, avoiding vague terms. Answer: What exactly will be done?",
+        'Example: Instead of "learn programming" → "Complete a Python web development course and build 3 portfolio projects"',
+        "Specific goal"
+    ),
+    "measurable": (
+        "Define how progress and completion will be measured. Include numbers, quantities, or clear completion criteria. Answer: How will I know when it's accomplished?",
+        'Example: "Complete 40 hours of coursework, submit 3 projects, pass final assessment with 80%+ score"',
+        "Measurable criteria"
+    ),
+    "achievable": (
+        "Assess if this goal is realistic and attainable given typical constraints. Consider time, resources, and skills needed. Answer: Is this goal realistic?",
+        'Example: "Given my current schedule of 1-2 hours per day for learning, this 3-month timeline is achievable with consistent effort"',
+        "Achievability assessment"
+    ),
+    "relevant": (
+        "Explain why this goal matters and how it aligns with broader objectives or values. Answer: Why is this goal important?",
+        'Example: "This skill will advance my career prospects, increase my problem-solving abilities, and align with my goal of transitioning to tech"',
+        "Relevance"
+    ),
+    "time_bound": (
+        "Set a realistic timeline with specific deadlines or milestones. Answer: When will this be completed?",
+        'Example: "Complete by March 15th, with weekly milestones: Week 1-4: Course modules, Week 5-8: Project 1, Week 9-12: Projects 2&3"',
+        "Timeline"
+    ),
+}
+
+# Fields already filled in that give context to the one being generated
+SMART_FIELD_CONTEXT = {
+    "measurable": ["specific"],
+    "time_bound": ["specific", "measurable"],
+}
+
+def smart_field_system_prompt(field_type: str) -> str:
+    instructions, example, _ = SMART_FIELD_INSTRUCTIONS[field_type]
+    return f"{SMART_SYSTEM_PROMPT}\n\n{instructions}\n\n{example}"
+
 class SMARTFieldGenerationRequest(BaseModel):
     goal_title: str
     field_type: str  # "description", "specific", "measurable", "achievable", "relevant", "time_bound"
@@ -1027,90 +1727,27 @@ class SMARTFieldGenerationRequest(BaseModel):
 @app.post("/generate-smart-field")
 def generate_smart_field(request: SMARTFieldGenerationRequest):
     try:
-        # Create context-aware prompts for each field type
-        prompts = {
-            "description": f"""
-                Goal Title: "{request.goal_title}"
-                Category: {request.category}
-                
-                Write a clear, motivating 2-3 sentence description for this goal. Focus on why this goal matters and what achieving it would mean. Keep it inspiring but realistic.
-                
-                Example format: "This goal focuses on [specific area] to help me [benefit/outcome]. By achieving this, I will [impact on life/career/wellbeing]. This aligns with my desire to [bigger picture/values]."
-                
-                Description:""",
-                
-            "specific": f"""
-                Goal: "{request.goal_title}"
-                Category: {request.category}
-                
-                Make this goal specific and clear. Define exactly what will be accomplished, avoiding vague terms. Answer: What exactly will be done?
-                
-                Example: Instead of "learn programming" → "Complete a Python web development course and build 3 portfolio projects"
-                
-                Specific goal:""",
-                
-            "measurable": f"""
-                Goal: "{request.goal_title}"
-                Category: {request.category}
-                {f"Specific criteria: {request.existing_content.get('specific', '')}" if request.existing_content.get('specific') else ""}
-                
-                Define how progress and completion will be measured. Include numbers, quantities, or clear completion criteria. Answer: How will I know when it's accomplished?
-                
-                Example: "Complete 40 hours of coursework, submit 3 projects, pass final assessment with 80%+ score"
-                
-                Measurable criteria:""",
-                
-            "achievable": f"""
-                Goal: "{request.goal_title}"
-                Category: {request.category}
-                
-                Assess if this goal is realistic and attainable given typical constraints. Consider time, resources, and skills needed. Answer: Is this goal realistic?
-                
-                Example: "Given my current schedule of 1-2 hours per day for learning, this 3-month timeline is achievable with consistent effort"
-                
-                Achievability assessment:""",
-                
-            "relevant": f"""
-                Goal: "{request.goal_title}"
-                Category: {request.category}
-                
-                Explain why this goal matters and how it aligns with broader objectives or values. Answer: Why is this goal important?
-                
-                Example: "This skill will advance my career prospects, increase my problem-solving abilities, and align with my goal of transitioning to tech"
-                
-                Relevance:""",
-                
-            "time_bound": f"""
-                Goal: "{request.goal_title}"
-                Category: {request.category}
-                {f"Specific: {request.existing_content.get('specific', '')}" if request.existing_content.get('specific') else ""}
-                {f"Measurable: {request.existing_content.get('measurable', '')}" if request.existing_content.get('measurable') else ""}
-                
-                Set a realistic timeline with specific deadlines or milestones. Answer: When will this be completed?
-                
-                Example: "Complete by March 15th, with weekly milestones: Week 1-4: Course modules, Week 5-8: Project 1, Week 9-12: Projects 2&3"
-                
-                Timeline:"""
-        }
-        
-        if request.field_type not in prompts:
+        if request.field_type not in SMART_FIELD_INSTRUCTIONS:
             raise HTTPException(status_code=400, detail="Invalid field type")
         
-        prompt = prompts[request.field_type]
+        # The instructions are a fixed system message; only the goal details vary
+        system = smart_field_system_prompt(request.field_type)
+        context = [f'Goal: "{request.goal_title}"', f"Category: {request.category}"]
+        for field in SMART_FIELD_CONTEXT.get(request.field_type, []):
+            if request.existing_content.get(field):
+                context.append(f"{field.capitalize()}: {request.existing_content[field]}")
+        
+        prompt = (
+            PromptBuilder("generate_smart_field", system=system)
+            .text("\n".join(context), max_tokens=800)
+            .text(f"{SMART_FIELD_INSTRUCTIONS[request.field_type][2]}:")
+            .build()
+        )
         
         # Generate using Ollama
         try:
-            response = ollama.generate(
-                model='phi3:mini',
-                prompt=prompt,
-                options={
-                    'temperature': 0.7,
-                    'max_tokens': 200,
-                    'stop': ['\n\n', 'Goal:', 'Example:', 'Note:']
-                }
-            )
-            
-            generated_content = response['response'].strip()
+            # Temperature, reply length and stop sequences come from the route
+            generated_content = llm.generate(prompt, "generate_smart_field", system=system).strip()
             
             # Clean up the response (remove any prompt echoes)
             lines = generated_content.split('\n')
@@ -1151,6 +1788,20 @@ def generate_smart_field(request: SMARTFieldGenerationRequest):
         raise HTTPException(status_code=500, detail="Failed to generate field content")
 
 # Analysis history endpoint
+def summary_has_more(summary: str, word_count: Optional[int]) -> bool:
+    """Whether the analysis text goes on past its summary, without reading the text.
+
+    A cut summary (see create_summary) ends in "..." and either runs past
+    ANALYSIS_SUMMARY_LENGTH or, when whitespace was trimmed at the cut, has
+    fewer words than the text. Rows not yet backfilled have no word count;
+    their summary is a plain prefix, cut if it is full length.
+    """
+    if word_count is None:
+        return len(summary) >= ANALYSIS_SUMMARY_LENGTH
+    if not summary.endswith("..."):
+        return False
+    return len(summary) > ANALYSIS_SUMMARY_LENGTH or word_count > count_words(summary)
+
 @app.get("/analysis/history")
 def get_analysis_history(
     page: int = Query(1, ge=1),
@@ -1160,7 +1811,17 @@ def get_analysis_history(
     end_date: Optional[str] = Query(None),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Analysis)
+    # The full ai_response stays in the database; pages only carry the stored
+    # summary and the text is fetched per analysis from /analysis/{id}
+    query = db.query(
+        Analysis.id,
+        Analysis.date,
+        func.coalesce(Analysis.summary, func.substr(Analysis.ai_response, 1, ANALYSIS_SUMMARY_LENGTH)).label("summary"),
+        Analysis.word_count,
+        Analysis.model_used,
+        Analysis.processing_time,
+        Analysis.created_at
+    )
     
     # Apply filters
     if search:
@@ -1177,22 +1838,15 @@ def get_analysis_history(
     offset = (page - 1) * page_size
     analyses = query.order_by(Analysis.created_at.desc()).offset(offset).limit(page_size).all()
     
-    # Create summary for each analysis (first 200 characters)
-    def create_summary(text):
-        if not text:
-            return ""
-        summary = text[:200].strip()
-        if len(text) > 200:
-            summary += "..."
-        return summary
-    
-    return {
+    return FastJSONResponse({
         "analyses": [
             {
                 "id": analysis.id,
                 "date": analysis.date,
-                "analysis": analysis.ai_response,
-                "summary": create_summary(analysis.ai_response),
+                "summary": analysis.summary or "",
+                "word_count": analysis.word_count,
+                "has_more": summary_has_more(analysis.summary or "", analysis.word_count),
+                "model_used": analysis.model_used,
                 "processing_time": analysis.processing_time,
                 "created_at": analysis.created_at
             }
@@ -1206,8 +1860,55 @@ def get_analysis_history(
             "has_next": page * page_size < total_count,
             "has_prev": page > 1
         }
+    })
+
+@app.get("/analysis/{analysis_id}")
+def get_analysis(analysis_id: int, db: Session = Depends(get_db)):
+    analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    
+    return FastJSONResponse({
+        "id": analysis.id,
+        "date": analysis.date,
+        "analysis": analysis.ai_response or "",
+        "summary": analysis.summary or create_summary(analysis.ai_response),
+        "word_count": analysis.word_count,
+        "model_used": analysis.model_used,
+        "processing_time": analysis.processing_time,
+        "model_load_time": analysis.model_load_time,
+        "version": analysis.version,
+        "tier": analysis.tier,
+        "created_at": analysis.created_at
+    })
+
+@app.get("/model/status")
+def get_model_status():
+    """Model server health, model routes, off-peak precomputation, and how long the models last took to load"""
+    return {
+        "circuit": llm.circuit.status(),
+        "embedding_circuits": {model: breaker.status() for model, breaker in list(llm.embedding_circuits.items())},
+        **model_keeper.status(),
+        "precompute": precomputer.status(),
+        "routes": {
+            name: {"model": configured.model, "options": configured.options()}
+            for name, configured in model_registry.model_routes.items()
+        },
     }
 
+@app.get("/metrics/llm")
+def get_llm_metrics(
+    hours: float = Query(24, gt=0),
+    endpoint: Optional[str] = Query(None, description="Only calls on this model route (or \"embed\")")
+):
+    """Model call counts, cache hit rate and p50/p90/p99 of timings, speed and token counts"""
+    return llm_telemetry.summary(hours, endpoint)
+
+@app.get("/metrics/prompts")
+def get_prompt_metrics():
+    """Recent prompt sizes per endpoint (estimated tokens against the budget)"""
+    return prompt_metrics.summary()
+
 # Export endpoints
 @app.get("/export/notes")
 def export_notes(
@@ -1319,90 +2020,155 @@ def export_goals(
 def analyze_historical_data(request: AnalyticsRequest, db: Session = Depends(get_db)):
     start_time = time.time()
     
+    cache_key = analytics_cache_key(request)
+    cached = analytics_cache.get(cache_key)
+    if cached is not None:
+        return cached.model_copy(update={"processing_time": time.time() - start_time})
+    
+    response = compute_analytics(request, db, start_time)
+    # Fallback results are not cached so the next request retries the model
+    if not response.fallback_used:
+        analytics_cache.put(cache_key, response)
+    return response
+
+# Analysis types whose output depends on goals regardless of the date range
+GOAL_DEPENDENT_ANALYTICS = {"patterns", "goals"}
+
+def analytics_cache_key(request: AnalyticsRequest):
+    goals_version = data_versions.scope("goals") if request.analysis_type in GOAL_DEPENDENT_ANALYTICS else 0
+    return (
+        request.analysis_type,
+        request.start_date,
+        request.end_date,
+        data_versions.max_in_range(request.start_date, request.end_date),
+        goals_version
+    )
+
+def compute_analytics(request: AnalyticsRequest, db: Session, start_time: float) -> AnalyticsResponse:
+    plan = ANALYTICS_PLANS.get(request.analysis_type)
+    if plan is None:
+        raise HTTPException(status_code=400, detail="Invalid analysis type")
+    
+    handler, sources = plan
+    # Only the sources this analysis type declared are queried, and note
+    # sources are generators that stream rows as the handler iterates them
+    data = {argument: ANALYTICS_SOURCES[source](db, request) for argument, source in sources.items()}
+    
     try:
-        # Get notes and analyses for the date range
-        notes = db.query(Note).filter(
-            Note.date >= request.start_date,
-            Note.date <= request.end_date
-        ).order_by(Note.date, Note.hour).all()
-        
-        analyses = db.query(Analysis).filter(
-            Analysis.date >= request.start_date,
-            Analysis.date <= request.end_date
-        ).order_by(Analysis.date).all()
-        
-        goals = db.query(Goal).all()
-        
-        if request.analysis_type == "patterns":
-            return analyze_patterns(notes, analyses, goals, request, start_time)
-        elif request.analysis_type == "trends":
-            return analyze_trends(notes, analyses, request, start_time)
-        elif request.analysis_type == "goals":
-            return analyze_goal_progress(goals, notes, analyses, request, start_time)
-        elif request.analysis_type == "weekly":
-            return analyze_weekly_summary(notes, analyses, request, start_time)
-        elif request.analysis_type == "monthly":
-            return analyze_monthly_summary(notes, analyses, request, start_time)
-        else:
-            raise HTTPException(status_code=400, detail="Invalid analysis type")
-            
+        return handler(request=request, start_time=start_time, **data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analytics failed: {str(e)}")
 
-def analyze_patterns(notes, analyses, goals, request, start_time):
+# Analytics data sources. Note sources stream plain rows in batches instead of
+# materializing ORM objects for the whole range.
+ANALYTICS_STREAM_BATCH_SIZE = 1000
+
+class NoteActivity(NamedTuple):
+    date: str
+    hour: int
+    content: str
+    tags: List[str]
+
+def stream_note_activity(db: Session, request: AnalyticsRequest):
+    """Date, hour and content of every note in the range, without tags"""
+    rows = (
+        db.query(Note.date, Note.hour, Note.content)
+        .filter(Note.date >= request.start_date, Note.date <= request.end_date)
+        .order_by(Note.date, Note.hour)
+        .yield_per(ANALYTICS_STREAM_BATCH_SIZE)
+    )
+    for note_date, hour, content in rows:
+        yield NoteActivity(note_date, hour, content or "", [])
+
+def stream_notes_with_tags(db: Session, request: AnalyticsRequest):
+    """Notes in the range with their tag names, folded from one outer join"""
+    rows = (
+        db.query(Note.id, Note.date, Note.hour, Note.content, Tag.name)
+        .outerjoin(note_tags, note_tags.c.note_id == Note.id)
+        .outerjoin(Tag, Tag.id == note_tags.c.tag_id)
+        .filter(Note.date >= request.start_date, Note.date <= request.end_date)
+        .order_by(Note.date, Note.hour, Note.id)
+        .yield_per(ANALYTICS_STREAM_BATCH_SIZE)
+    )
+    current_id = None
+    current = None
+    for note_id, note_date, hour, content, tag_name in rows:
+        if note_id != current_id:
+            if current is not None:
+                yield current
+            current_id = note_id
+            current = NoteActivity(note_date, hour, content or "", [])
+        if tag_name is not None:
+            current.tags.append(tag_name)
+    if current is not None:
+        yield current
+
+def load_goals(db: Session, request: AnalyticsRequest):
+    return db.query(Goal).all()
+
+def load_active_goals(db: Session, request: AnalyticsRequest):
+    return db.query(Goal.title, Goal.description).filter(Goal.status == 'active').all()
+
+def use_session(db: Session, request: AnalyticsRequest):
+    return db
+
+ANALYTICS_SOURCES = {
+    "session": use_session,
+    "note_activity": stream_note_activity,
+    "notes_with_tags": stream_notes_with_tags,
+    "goals": load_goals,
+    "active_goals": load_active_goals,
+}
+
+def analyze_patterns(notes, goals, db, request, start_time):
     """Analyze patterns across multiple days"""
     
-    # Group notes by day and extract activities
-    daily_activities = {}
-    for note in notes:
-        if note.date not in daily_activities:
-            daily_activities[note.date] = []
-        if note.content.strip():
-            daily_activities[note.date].append({
-                'hour': note.hour,
-                'content': note.content,
-                'tags': [tag.name for tag in note.tags]
-            })
-    
-    # Create AI prompt for pattern analysis
-    activity_summary = ""
-    for date, activities in daily_activities.items():
-        activity_summary += f"\n{date}:\n"
-        for activity in activities:
-            activity_summary += f"  {activity['hour']}:00 - {activity['content'][:100]}\n"
-    
-    prompt = f"""
-    Analyze the following journal entries from {request.start_date} to {request.end_date} for patterns, habits, and trends.
-    
-    JOURNAL ENTRIES:
-    {activity_summary}
-    
-    ACTIVE GOALS:
-    {chr(10).join([f"- {goal.title}: {goal.description}" for goal in goals if goal.status == 'active'])}
-    
-    Identify:
-    1. Recurring behavioral patterns
-    2. Time-of-day activity patterns  
-    3. Productivity patterns
-    4. Emotional/mood patterns
-    5. Areas of consistent progress or struggle
-    6. Habits that support or hinder goals
-    
-    Provide insights in a structured format focusing on:
-    - What patterns you observe
-    - How frequently they occur
-    - Their impact on goals and wellbeing
-    - Specific recommendations for optimization
-    
-    Analysis:
-    """
+    daily_activities = group_daily_activities(notes)
+    deadline = time.monotonic() + PATTERN_ANALYSIS_DEADLINE
     
     try:
-        response = ollama.chat(model='phi3:mini', messages=[
-            {'role': 'user', 'content': prompt}
-        ])
+        # Notes are condensed per day and then per week, so the prompt grows
+        # with the number of weeks rather than the number of entries. Stored
+        # summaries are reused for days and weeks whose notes did not change;
+        # those finished before the deadline are kept for the next request.
+        weekly_summaries = summarize_range(db, daily_activities, deadline)
+        # If the range is too long for the context budget, recent weeks win
+        prompt = (
+            PromptBuilder("analyze_patterns")
+            .text(f"Analyze the following journal summaries from {request.start_date} to {request.end_date} for patterns, habits, and trends.")
+            .section(
+                "WEEKLY SUMMARIES:",
+                [f"Week of {week}: {summary}" for week, summary in weekly_summaries],
+                scores=list(range(len(weekly_summaries))),
+                share=3
+            )
+            .section(
+                "ACTIVE GOALS:",
+                [f"- {goal.title}: {goal.description}" for goal in goals],
+                scores=relevance_scores([f"{goal.title} {goal.description}" for goal in goals], activity_text(weekly_summaries)),
+                max_item_tokens=80
+            )
+            .text("""
+                Identify:
+                1. Recurring behavioral patterns
+                2. Time-of-day activity patterns
+                3. Productivity patterns
+                4. Emotional/mood patterns
+                5. Areas of consistent progress or struggle
+                6. Habits that support or hinder goals
+
+                Provide insights in a structured format focusing on:
+                - What patterns you observe
+                - How frequently they occur
+                - Their impact on goals and wellbeing
+                - Specific recommendations for optimization
+
+                Analysis:
+            """)
+            .build()
+        )
         
-        ai_analysis = response['message']['content']
+        ai_analysis = llm.chat(prompt, "analyze_patterns", deadline=deadline)
         
         # Extract patterns (simplified - in a real app you might use more sophisticated NLP)
         patterns = [
@@ -1441,9 +2207,27 @@ def analyze_patterns(notes, analyses, goals, request, start_time):
             patterns=patterns,
             trends=[],
             insights=["Fallback pattern analysis completed"],
-            processing_time=time.time() - start_time
+            processing_time=time.time() - start_time,
+            fallback_used=True
         )
 
+def group_daily_activities(notes) -> Dict[str, List[dict]]:
+    """Group notes by day and extract activities"""
+    daily_activities = {}
+    for note in notes:
+        if note.date not in daily_activities:
+            daily_activities[note.date] = []
+        if note.content.strip():
+            daily_activities[note.date].append({
+                'hour': note.hour,
+                'content': note.content,
+                'tags': note.tags
+            })
+    return daily_activities
+
+def activity_text(weekly_summaries):
+    return " ".join(summary for _, summary in weekly_summaries)
+
 def analyze_patterns_fallback(daily_activities, goals):
     """Fallback pattern analysis without AI"""
     patterns = []
@@ -1484,7 +2268,7 @@ def analyze_patterns_fallback(daily_activities, goals):
     
     return patterns
 
-def analyze_trends(notes, analyses, request, start_time):
+def analyze_trends(notes, request, start_time):
     """Analyze trends over time"""
     
     # Calculate daily activity levels
@@ -1524,7 +2308,7 @@ def analyze_trends(notes, analyses, request, start_time):
         processing_time=time.time() - start_time
     )
 
-def analyze_goal_progress(goals, notes, analyses, request, start_time):
+def analyze_goal_progress(goals, request, start_time):
     """Analyze goal progress over time"""
     
     trends = []
@@ -1576,27 +2360,26 @@ def analyze_goal_progress(goals, notes, analyses, request, start_time):
         processing_time=time.time() - start_time
     )
 
-def analyze_weekly_summary(notes, analyses, request, start_time):
+def analyze_weekly_summary(notes, request, start_time):
     """Generate weekly summary analysis"""
     
     # Group notes by week
     from datetime import datetime, timedelta
     from collections import defaultdict
     
-    weekly_data = defaultdict(list)
+    # Only counts are kept, so notes can be streamed through
+    weekly_data = defaultdict(int)
     
     for note in notes:
         note_date = datetime.strptime(note.date, '%Y-%m-%d')
         week_start = note_date - timedelta(days=note_date.weekday())
         week_key = week_start.strftime('%Y-%m-%d')
-        weekly_data[week_key].append(note)
+        weekly_data[week_key] += 1 if note.content.strip() else 0
     
     insights = []
     trends = []
     
-    for week_start, week_notes in weekly_data.items():
-        entry_count = len([n for n in week_notes if n.content.strip()])
-        
+    for week_start, entry_count in weekly_data.items():
         trends.append(TrendData(
             date=week_start,
             value=float(entry_count),
@@ -1618,25 +2401,21 @@ def analyze_weekly_summary(notes, analyses, request, start_time):
         processing_time=time.time() - start_time
     )
 
-def analyze_monthly_summary(notes, analyses, request, start_time):
+def analyze_monthly_summary(notes, request, start_time):
     """Generate monthly summary analysis"""
     
-    from datetime import datetime
     from collections import defaultdict
     
-    monthly_data = defaultdict(list)
+    monthly_data = defaultdict(int)
     
     for note in notes:
-        note_date = datetime.strptime(note.date, '%Y-%m-%d')
-        month_key = note_date.strftime('%Y-%m')
-        monthly_data[month_key].append(note)
+        # Dates are YYYY-MM-DD, so the month key is a prefix
+        monthly_data[note.date[:7]] += 1 if note.content.strip() else 0
     
     insights = []
     trends = []
     
-    for month, month_notes in monthly_data.items():
-        entry_count = len([n for n in month_notes if n.content.strip()])
-        
+    for month, entry_count in monthly_data.items():
         trends.append(TrendData(
             date=f"{month}-01",
             value=float(entry_count),
@@ -1658,6 +2437,15 @@ def analyze_monthly_summary(notes, analyses, request, start_time):
         processing_time=time.time() - start_time
     )
 
+# Handler and data sources for each analysis type, keyed by handler argument
+ANALYTICS_PLANS = {
+    "patterns": (analyze_patterns, {"notes": "notes_with_tags", "goals": "active_goals", "db": "session"}),
+    "trends": (analyze_trends, {"notes": "note_activity"}),
+    "goals": (analyze_goal_progress, {"goals": "goals"}),
+    "weekly": (analyze_weekly_summary, {"notes": "note_activity"}),
+    "monthly": (analyze_monthly_summary, {"notes": "note_activity"}),
+}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,51 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from database import Base, DATABASE_URL
+
+config = context.config
+
+# Only configure logging when run from the alembic CLI; the app calls into
+# alembic with its own connection and keeps its own logging setup
+if config.config_file_name is not None and config.attributes.get("connection") is None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def run_migrations_offline():
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    def run(connection):
+        # render_as_batch lets autogenerate emit SQLite-safe ALTER TABLE moves
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=True,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        # Called from database.init_database() inside its own transaction
+        run(connection)
+        return
+
+    engine = create_engine(DATABASE_URL)
+    with engine.connect() as connection:
+        run(connection)
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
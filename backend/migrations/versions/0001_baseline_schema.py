@@ -0,0 +1,134 @@
+"""Baseline schema, as previously built by Base.metadata.create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "notes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("date", sa.String(), nullable=False),
+        sa.Column("hour", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text()),
+        sa.Column("rich_content", sa.JSON()),
+        sa.Column("template_id", sa.String(), nullable=True),
+        sa.Column("is_sleep", sa.Boolean()),
+        sa.Column("sleep_quality", sa.Integer(), nullable=True),
+        sa.Column("sleep_notes", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_notes_id", "notes", ["id"])
+
+    op.create_table(
+        "goals",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("category", sa.String()),
+        sa.Column("target_date", sa.DateTime(), nullable=True),
+        sa.Column("progress", sa.Float()),
+        sa.Column("status", sa.String()),
+        sa.Column("is_smart", sa.Boolean()),
+        sa.Column("specific", sa.Text(), nullable=True),
+        sa.Column("measurable", sa.Text(), nullable=True),
+        sa.Column("achievable", sa.Text(), nullable=True),
+        sa.Column("relevant", sa.Text(), nullable=True),
+        sa.Column("time_bound", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_goals_id", "goals", ["id"])
+
+    op.create_table(
+        "milestones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("goal_id", sa.Integer(), sa.ForeignKey("goals.id"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("target_date", sa.DateTime(), nullable=True),
+        sa.Column("completed", sa.Boolean()),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_milestones_id", "milestones", ["id"])
+
+    op.create_table(
+        "goal_categories",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False, unique=True),
+        sa.Column("description", sa.Text()),
+        sa.Column("icon", sa.String()),
+        sa.Column("color", sa.String()),
+        sa.Column("is_default", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_goal_categories_id", "goal_categories", ["id"])
+
+    op.create_table(
+        "tags",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False, unique=True),
+        sa.Column("color", sa.String()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_tags_id", "tags", ["id"])
+
+    op.create_table(
+        "note_tags",
+        sa.Column("note_id", sa.Integer(), sa.ForeignKey("notes.id"), primary_key=True),
+        sa.Column("tag_id", sa.Integer(), sa.ForeignKey("tags.id"), primary_key=True),
+    )
+
+    op.create_table(
+        "sleep_schedules",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("start_hour", sa.Integer(), nullable=False),
+        sa.Column("end_hour", sa.Integer(), nullable=False),
+        sa.Column("default_quality", sa.Integer(), nullable=True),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_sleep_schedules_id", "sleep_schedules", ["id"])
+
+    op.create_table(
+        "analyses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("date", sa.String(), nullable=False),
+        sa.Column("notes_content", sa.JSON()),
+        sa.Column("goals_content", sa.Text()),
+        sa.Column("ai_response", sa.Text()),
+        sa.Column("model_used", sa.String()),
+        sa.Column("processing_time", sa.Float()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_analyses_id", "analyses", ["id"])
+
+    op.create_table(
+        "note_templates",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("category", sa.String()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_note_templates_id", "note_templates", ["id"])
+
+def downgrade():
+    for table in (
+        "note_templates", "analyses", "sleep_schedules", "note_tags",
+        "tags", "goal_categories", "milestones", "goals", "notes",
+    ):
+        op.drop_table(table)
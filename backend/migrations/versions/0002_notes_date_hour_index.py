@@ -0,0 +1,20 @@
+"""Index notes on (date, hour) for per-day and range lookups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Databases started between the grid endpoint and this migration may
+    # already have the index from create_all
+    op.create_index("ix_notes_date_hour", "notes", ["date", "hour"], if_not_exists=True)
+
+def downgrade():
+    op.drop_index("ix_notes_date_hour", table_name="notes")
@@ -0,0 +1,24 @@
+"""Store a summary and word count with each analysis
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Existing rows are filled in by the analysis_summary backfill
+    with op.batch_alter_table("analyses") as batch_op:
+        batch_op.add_column(sa.Column("summary", sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column("word_count", sa.Integer(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("analyses") as batch_op:
+        batch_op.drop_column("word_count")
+        batch_op.drop_column("summary")
@@ -0,0 +1,30 @@
+"""Cache LLM summaries of days and weeks of notes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "note_summaries",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("period", sa.String(), nullable=False),
+        sa.Column("period_start", sa.String(), nullable=False),
+        sa.Column("source_hash", sa.String(), nullable=False),
+        sa.Column("summary", sa.Text(), nullable=False),
+        sa.Column("model_used", sa.String()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.UniqueConstraint("period", "period_start", name="uq_note_summaries_period"),
+    )
+    op.create_index("ix_note_summaries_id", "note_summaries", ["id"])
+
+def downgrade():
+    op.drop_table("note_summaries")
@@ -0,0 +1,21 @@
+"""Record model load time separately from analysis processing time
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("analyses") as batch_op:
+        batch_op.add_column(sa.Column("model_load_time", sa.Float(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("analyses") as batch_op:
+        batch_op.drop_column("model_load_time")
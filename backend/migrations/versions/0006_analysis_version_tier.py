@@ -0,0 +1,23 @@
+"""Version and tier of each stored analysis, for draft-then-refine analyses
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("analyses") as batch_op:
+        batch_op.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+        batch_op.add_column(sa.Column("tier", sa.String(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("analyses") as batch_op:
+        batch_op.drop_column("tier")
+        batch_op.drop_column("version")
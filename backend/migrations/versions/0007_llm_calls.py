@@ -0,0 +1,38 @@
+"""Telemetry of every model call
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "llm_calls",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("endpoint", sa.String(), nullable=False),
+        sa.Column("model", sa.String(), nullable=False),
+        sa.Column("outcome", sa.String(), nullable=False),
+        sa.Column("prompt_tokens", sa.Integer(), nullable=True),
+        sa.Column("estimated_prompt_tokens", sa.Integer(), nullable=True),
+        sa.Column("completion_tokens", sa.Integer(), nullable=True),
+        sa.Column("load_time", sa.Float(), nullable=True),
+        sa.Column("prompt_eval_time", sa.Float(), nullable=True),
+        sa.Column("eval_time", sa.Float(), nullable=True),
+        sa.Column("total_time", sa.Float(), nullable=True),
+        sa.Column("wall_time", sa.Float(), nullable=False),
+        sa.Column("tokens_per_second", sa.Float(), nullable=True),
+        sa.Column("cache_hit", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_llm_calls_id", "llm_calls", ["id"])
+    op.create_index("ix_llm_calls_created_at", "llm_calls", ["created_at"])
+
+def downgrade():
+    op.drop_table("llm_calls")
@@ -0,0 +1,104 @@
+"""Keeps the local models loaded while the app is likely to be used.
+
+Ollama unloads a model once its keep_alive runs out, and the next request then
+pays the full load time. ModelKeeper preloads every model used by a route in
+model_registry when the server starts and, during the configured active hours,
+refreshes their keep_alive with an empty generation at a fixed interval.
+Outside those hours nothing is sent, so the models expire and free their memory.
+
+Settings (environment):
+    LLM_ACTIVE_HOURS        "start-end" local hours, end exclusive; may wrap
+                            past midnight ("22-6"). Default "7-23".
+    LLM_KEEPALIVE_INTERVAL  Seconds between keep-alives. Default 240.
+    LLM_PRELOAD             Set to "0" to skip loading the models at startup.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import llm
+import model_registry
+
+def parse_active_hours(value: str) -> Tuple[int, int]:
+    start, end = (int(part) for part in value.split("-", 1))
+    if not (0 <= start <= 23 and 0 <= end <= 24):
+        raise ValueError(f"Invalid active hours: {value!r}")
+    return start, end
+
+def in_hours(hours: Tuple[int, int], now: Optional[datetime] = None) -> bool:
+    """Whether the local hour of `now` falls in a (start, end) window"""
+    hour = (now or datetime.now()).hour
+    start, end = hours
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+LLM_ACTIVE_HOURS = parse_active_hours(os.getenv("LLM_ACTIVE_HOURS", "7-23"))
+LLM_KEEPALIVE_INTERVAL = float(os.getenv("LLM_KEEPALIVE_INTERVAL", "240"))
+LLM_PRELOAD = os.getenv("LLM_PRELOAD", "1") != "0"
+
+class ModelKeeper:
+    def __init__(self, models: Optional[List[str]] = None, active_hours: Tuple[int, int] = LLM_ACTIVE_HOURS,
+                 interval: float = LLM_KEEPALIVE_INTERVAL, preload: bool = LLM_PRELOAD):
+        self.models = models or model_registry.models()
+        self.active_hours = active_hours
+        self.interval = interval
+        self.preload = preload
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._last_ping: Dict[str, float] = {}
+        self._last_load_time: Dict[str, float] = {}
+        self._last_error: Dict[str, str] = {}
+
+    def in_active_hours(self, now: Optional[datetime] = None) -> bool:
+        return in_hours(self.active_hours, now)
+
+    def ping(self):
+        """Load each model, or just refresh its keep_alive if it is resident"""
+        # While the circuit is open its own probe watches for recovery
+        if llm.circuit.is_open:
+            return
+        for model in self.models:
+            try:
+                load_time = llm.load_model(model)
+            except Exception as e:
+                with self._lock:
+                    self._last_error[model] = str(e)
+                continue
+            with self._lock:
+                self._last_ping[model] = time.time()
+                self._last_load_time[model] = load_time
+                self._last_error.pop(model, None)
+
+    def run(self):
+        if self.preload:
+            self.ping()
+        while not self._stop.wait(self.interval):
+            if self.in_active_hours():
+                self.ping()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "active_hours": f"{self.active_hours[0]}-{self.active_hours[1]}",
+                "in_active_hours": self.in_active_hours(),
+                "keep_alive": llm.KEEP_ALIVE,
+                "models": {
+                    model: {
+                        "last_ping": datetime.fromtimestamp(self._last_ping[model]) if model in self._last_ping else None,
+                        "last_load_time": self._last_load_time.get(model),
+                        "last_error": self._last_error.get(model),
+                    }
+                    for model in self.models
+                },
+            }
@@ -0,0 +1,94 @@
+"""Which model each LLM task runs on, and with which generation options.
+
+Every LLM call names a route ("analyze", "generate_smart_field", ...). A route
+fixes the model and the Ollama options sent with it: context size (num_ctx),
+reply length (num_predict), temperature, CPU threads and stop sequences, plus
+a deadline in seconds after which the call is cut off (see llm). The
+prompt builder sizes prompts from the same route, so prompts always fit the
+context the model is actually run with.
+
+Defaults keep daily analysis and pattern summaries on LLM_MODEL and send the
+short tasks (analysis drafts, SMART fields, timetables) to LLM_FAST_MODEL, which
+defaults to the same model. The "embed" route only sets the deadline of
+embedding calls to EMBEDDING_MODEL (see embeddings); it generates nothing. LLM_NUM_THREAD sets the CPU threads for every
+route. For finer control point LLM_MODEL_CONFIG at a JSON file of per-route
+overrides, e.g.
+
+    {"generate_smart_field": {"model": "qwen2.5:0.5b", "num_ctx": 1024},
+     "analyze": {"num_thread": 8, "deadline": 300}}
+"""
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+DEFAULT_MODEL = os.getenv("LLM_MODEL", "phi3:mini")
+FAST_MODEL = os.getenv("LLM_FAST_MODEL", DEFAULT_MODEL)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+LLM_NUM_THREAD = int(os.getenv("LLM_NUM_THREAD", "0")) or None
+
+class ModelRoute(NamedTuple):
+    model: str
+    num_ctx: int
+    num_predict: int
+    temperature: float = 0.7
+    num_thread: Optional[int] = LLM_NUM_THREAD
+    stop: Tuple[str, ...] = ()
+    deadline: Optional[float] = None  # seconds, including the wait for a generation slot
+
+    def options(self) -> dict:
+        """Ollama request options for this route"""
+        options = {
+            "num_ctx": self.num_ctx,
+            "num_predict": self.num_predict,
+            "temperature": self.temperature,
+        }
+        if self.num_thread:
+            options["num_thread"] = self.num_thread
+        if self.stop:
+            options["stop"] = list(self.stop)
+        return options
+
+DEFAULT_ROUTE = "default"
+EMBED_ROUTE = "embed"
+
+DEFAULT_ROUTES = {
+    DEFAULT_ROUTE: ModelRoute(DEFAULT_MODEL, num_ctx=4096, num_predict=512, deadline=120),
+    "analyze": ModelRoute(DEFAULT_MODEL, num_ctx=4096, num_predict=768, deadline=120),
+    "analyze_draft": ModelRoute(FAST_MODEL, num_ctx=2048, num_predict=256, temperature=0.5, deadline=10),
+    "analyze_patterns": ModelRoute(DEFAULT_MODEL, num_ctx=4096, num_predict=768, deadline=90),
+    "summarize_day": ModelRoute(DEFAULT_MODEL, num_ctx=4096, num_predict=256, temperature=0.3, deadline=60),
+    "summarize_week": ModelRoute(DEFAULT_MODEL, num_ctx=4096, num_predict=256, temperature=0.3, deadline=60),
+    "generate_timetable": ModelRoute(FAST_MODEL, num_ctx=4096, num_predict=1536, temperature=0.4, deadline=30),
+    "generate_smart_field": ModelRoute(
+        FAST_MODEL, num_ctx=2048, num_predict=200,
+        stop=("\n\n", "Goal:", "Example:", "Note:"), deadline=15
+    ),
+    EMBED_ROUTE: ModelRoute(EMBEDDING_MODEL, num_ctx=2048, num_predict=0, deadline=60),
+}
+
+def load_routes(path: Optional[str] = None) -> Dict[str, ModelRoute]:
+    """Default routes with the overrides from a JSON config file applied"""
+    routes = dict(DEFAULT_ROUTES)
+    if not path:
+        return routes
+
+    with open(path) as f:
+        overrides = json.load(f)
+    for name, fields in overrides.items():
+        unknown = set(fields) - set(ModelRoute._fields)
+        if unknown:
+            raise ValueError(f"Unknown options for model route {name!r}: {sorted(unknown)}")
+        if "stop" in fields:
+            fields = {**fields, "stop": tuple(fields["stop"])}
+        base = routes.get(name, routes[DEFAULT_ROUTE])
+        routes[name] = base._replace(**fields)
+    return routes
+
+model_routes = load_routes(os.getenv("LLM_MODEL_CONFIG"))
+
+def route(name: str) -> ModelRoute:
+    return model_routes.get(name, model_routes[DEFAULT_ROUTE])
+
+def models() -> List[str]:
+    """Every distinct model some generation route uses"""
+    return sorted({configured.model for name, configured in model_routes.items() if name != EMBED_ROUTE})
@@ -0,0 +1,109 @@
+"""Off-peak precomputation of model output the user will ask for later.
+
+Daily analyses and day summaries are otherwise generated while the user waits.
+Precomputer wakes up every PRECOMPUTE_INTERVAL seconds and, only inside the
+PRECOMPUTE_HOURS window, asks each task which keys are stale and refreshes them
+one at a time. The window is checked again before every key, so a run that
+overlaps the end of the window stops there and resumes the next night. Nothing
+is sent while the model server's circuit is open.
+
+Settings (environment):
+    PRECOMPUTE_HOURS          "start-end" local hours, end exclusive; may wrap
+                              past midnight ("23-6"). Default "1-6".
+    PRECOMPUTE_INTERVAL       Seconds between checks for stale work. Default 900.
+    PRECOMPUTE_LOOKBACK_DAYS  How many past days are kept fresh. Default 14.
+    PRECOMPUTE                Set to "0" to turn precomputation off.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import llm
+from model_keeper import in_hours, parse_active_hours
+
+PRECOMPUTE_HOURS = parse_active_hours(os.getenv("PRECOMPUTE_HOURS", "1-6"))
+PRECOMPUTE_INTERVAL = float(os.getenv("PRECOMPUTE_INTERVAL", "900"))
+PRECOMPUTE_LOOKBACK_DAYS = int(os.getenv("PRECOMPUTE_LOOKBACK_DAYS", "14"))
+PRECOMPUTE_ENABLED = os.getenv("PRECOMPUTE", "1") != "0"
+
+class PrecomputeTask(NamedTuple):
+    name: str
+    stale: Callable[[], List[str]]  # keys whose stored result is missing or out of date
+    refresh: Callable[[str], None]
+
+class Precomputer:
+    def __init__(self, tasks: List[PrecomputeTask], hours: Tuple[int, int] = PRECOMPUTE_HOURS,
+                 interval: float = PRECOMPUTE_INTERVAL, enabled: bool = PRECOMPUTE_ENABLED):
+        self.tasks = tasks
+        self.hours = hours
+        self.interval = interval
+        self.enabled = enabled
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._last_run: Optional[float] = None
+        self._refreshed: Dict[str, int] = {task.name: 0 for task in tasks}
+        self._pending: Dict[str, int] = {}
+        self._last_error: Dict[str, str] = {}
+
+    def can_run(self) -> bool:
+        return not self._stop.is_set() and in_hours(self.hours) and not llm.circuit.is_open
+
+    def run_once(self):
+        """Refresh every stale key of every task while the window stays open"""
+        for task in self.tasks:
+            if not self.can_run():
+                return
+            try:
+                keys = task.stale()
+            except Exception as e:
+                with self._lock:
+                    self._last_error[task.name] = str(e)
+                continue
+            with self._lock:
+                self._pending[task.name] = len(keys)
+            for key in keys:
+                if not self.can_run():
+                    return
+                try:
+                    task.refresh(key)
+                except Exception as e:
+                    with self._lock:
+                        self._last_error[task.name] = f"{key}: {e}"
+                else:
+                    with self._lock:
+                        self._refreshed[task.name] += 1
+                with self._lock:
+                    self._pending[task.name] -= 1
+        with self._lock:
+            self._last_run = time.time()
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            if self.can_run():
+                self.run_once()
+
+    def start(self):
+        if self.enabled:
+            threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "hours": f"{self.hours[0]}-{self.hours[1]}",
+                "in_window": in_hours(self.hours),
+                "last_completed_run": datetime.fromtimestamp(self._last_run) if self._last_run else None,
+                "tasks": {
+                    task.name: {
+                        "pending": self._pending.get(task.name, 0),
+                        "refreshed": self._refreshed[task.name],
+                        "last_error": self._last_error.get(task.name),
+                    }
+                    for task in self.tasks
+                },
+            }
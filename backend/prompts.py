@@ -0,0 +1,186 @@
+"""Token-budgeted prompt construction shared by the LLM endpoints.
+
+Prompts are assembled from fixed text parts and item sections (notes,
+summaries, ...). Whitespace is normalized, and item sections are filled in
+relevance order until the model's context budget is used up, so prompt size
+stays bounded no matter how much the user wrote. Every built prompt is
+recorded in `prompt_metrics`.
+"""
+import re
+import textwrap
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+
+from model_registry import route as model_route
+
+# Rough characters per token for English text with this family of tokenizers
+CHARS_PER_TOKEN = 4
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+STOP_WORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "have", "will", "want",
+    "about", "into", "more", "some", "what", "when", "were", "been", "then", "than",
+}
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def normalize_whitespace(text: str) -> str:
+    """Dedent, trim every line, squeeze inner runs of spaces and blank lines"""
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in textwrap.dedent(text).splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens at a word boundary"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max(0, max_tokens * CHARS_PER_TOKEN - 3)]
+    if " " in cut:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip() + "..."
+
+def keywords(text: str) -> set:
+    return {word for word in WORD_PATTERN.findall(text.lower()) if len(word) > 3 and word not in STOP_WORDS}
+
+def relevance_scores(items: Sequence[str], query: str) -> List[float]:
+    """Score items by keyword overlap with `query`, with a small bonus for detail"""
+    query_words = keywords(query)
+    scores = []
+    for item in items:
+        item_words = keywords(item)
+        overlap = len(item_words & query_words)
+        scores.append(overlap + min(len(item_words), 20) / 100)
+    return scores
+
+class PromptMetrics:
+    """Recent prompt sizes per endpoint, kept in memory"""
+
+    def __init__(self, max_records: int = 500):
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=max_records)
+
+    def record(self, **values):
+        with self._lock:
+            self._records.append({"timestamp": time.time(), **values})
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            records = list(self._records)
+        by_endpoint: Dict[str, List[dict]] = {}
+        for record in records:
+            by_endpoint.setdefault(record["endpoint"], []).append(record)
+        return {
+            endpoint: {
+                "prompts": len(items),
+                "avg_tokens": round(sum(r["tokens"] for r in items) / len(items), 1),
+                "max_tokens": max(r["tokens"] for r in items),
+                "budget": items[-1]["budget"],
+                "items_dropped": sum(r["items_dropped"] for r in items),
+                "items_truncated": sum(r["items_truncated"] for r in items),
+            }
+            for endpoint, items in by_endpoint.items()
+        }
+
+prompt_metrics = PromptMetrics()
+
+class _Section:
+    def __init__(self, title, items, scores, max_item_tokens, share, empty, max_tokens):
+        self.title = title
+        self.items = items
+        self.scores = scores
+        self.max_item_tokens = max_item_tokens
+        self.share = share
+        self.empty = empty
+        self.max_tokens = max_tokens
+
+class PromptBuilder:
+    """Builds one prompt within the context budget of an endpoint's model route.
+
+    `system` is the fixed instruction prefix sent ahead of the built prompt;
+    only its size matters here. Fixed `text` parts are always included (each optionally capped). Item
+    `section`s share whatever budget is left: items are taken in descending
+    score order while they fit, then written back in their original order.
+    A section's `max_tokens` caps its allowance whatever budget is left.
+    """
+
+    def __init__(self, endpoint: str, system: str = ""):
+        configured = model_route(endpoint)
+        self.endpoint = endpoint
+        self.model = configured.model
+        # The reply and the separately sent system prompt share the context
+        self.budget = configured.num_ctx - configured.num_predict - estimate_tokens(system)
+        self._parts = []
+
+    def text(self, text: str, max_tokens: Optional[int] = None) -> "PromptBuilder":
+        text = normalize_whitespace(text)
+        if max_tokens is not None:
+            text = truncate_to_tokens(text, max_tokens)
+        if text:
+            self._parts.append(text)
+        return self
+
+    def section(self, title: str, items: Sequence[str], scores: Optional[Sequence[float]] = None,
+                max_item_tokens: Optional[int] = None, share: float = 1.0,
+                empty: str = "(none)", max_tokens: Optional[int] = None) -> "PromptBuilder":
+        items = [normalize_whitespace(item) for item in items]
+        self._parts.append(_Section(title, items, scores, max_item_tokens, share, empty, max_tokens))
+        return self
+
+    def build(self) -> str:
+        sections = [part for part in self._parts if isinstance(part, _Section)]
+        fixed = sum(estimate_tokens(part) + 1 for part in self._parts if isinstance(part, str))
+        fixed += sum(estimate_tokens(section.title) + 1 for section in sections)
+        remaining = max(0, self.budget - fixed)
+
+        rendered = {}
+        dropped = truncated = 0
+        for index, section in enumerate(sections):
+            # Budget a section leaves unused carries over to the next ones
+            share_left = sum(s.share for s in sections[index:]) or 1.0
+            allowance = remaining * section.share / share_left if index < len(sections) - 1 else remaining
+            if section.max_tokens is not None:
+                allowance = min(allowance, section.max_tokens)
+            kept, used, section_dropped, section_truncated = self._fill(section, int(allowance))
+            remaining -= used
+            dropped += section_dropped
+            truncated += section_truncated
+            body = "\n".join(kept) if kept else section.empty
+            rendered[id(section)] = f"{section.title}\n{body}" if section.title else body
+
+        prompt = "\n\n".join(
+            rendered[id(part)] if isinstance(part, _Section) else part for part in self._parts
+        )
+        tokens = estimate_tokens(prompt)
+        prompt_metrics.record(
+            endpoint=self.endpoint,
+            model=self.model,
+            tokens=tokens,
+            budget=self.budget,
+            items_dropped=dropped,
+            items_truncated=truncated,
+        )
+        return prompt
+
+    def _fill(self, section: _Section, allowance: int):
+        items = section.items
+        if section.max_item_tokens is not None:
+            capped = [truncate_to_tokens(item, section.max_item_tokens) for item in items]
+            truncated = sum(1 for before, after in zip(items, capped) if before != after)
+            items = capped
+        else:
+            truncated = 0
+
+        scores = section.scores if section.scores is not None else [0.0] * len(items)
+        # Highest score first; ties keep the original order
+        order = sorted(range(len(items)), key=lambda i: -scores[i])
+        chosen = set()
+        used = 0
+        for i in order:
+            cost = estimate_tokens(items[i]) + 1
+            if used + cost <= allowance:
+                chosen.add(i)
+                used += cost
+        kept = [items[i] for i in range(len(items)) if i in chosen]
+        return kept, used, len(items) - len(kept), truncated
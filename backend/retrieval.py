@@ -0,0 +1,96 @@
+"""Long-term context for analyses, selected by relevance.
+
+A daily analysis only receives the day's notes. This module picks what else
+from the journal is worth showing the model: the past notes closest to the
+day's notes and goals in the semantic note index (above a minimum
+similarity), and the summaries of earlier analyses that share the most
+keywords with them, recent ones first on ties. Only the top `k` of each are returned; the prompt builder then keeps as
+many as fit the retrieval token budget, so prompts stay the same size however
+long the journal gets.
+
+Settings (environment):
+    RETRIEVAL_NOTES               Past notes retrieved per analysis. Default 8.
+    RETRIEVAL_MIN_SIMILARITY      Cosine similarity a past note needs. Default 0.1.
+    RETRIEVAL_ANALYSES            Earlier analyses retrieved. Default 4.
+    RETRIEVAL_ANALYSIS_CANDIDATES How many of the latest analyses are ranked. Default 60.
+    RETRIEVAL_TOKENS              Prompt tokens for retrieved context. Default 700.
+"""
+import os
+from typing import List, NamedTuple
+
+from sqlalchemy.orm import Session
+
+from database import Analysis, Note
+from prompts import relevance_scores
+from vector_index import day_number
+
+RETRIEVAL_NOTES = int(os.getenv("RETRIEVAL_NOTES", "8"))
+RETRIEVAL_MIN_SIMILARITY = float(os.getenv("RETRIEVAL_MIN_SIMILARITY", "0.1"))
+RETRIEVAL_ANALYSES = int(os.getenv("RETRIEVAL_ANALYSES", "4"))
+RETRIEVAL_ANALYSIS_CANDIDATES = int(os.getenv("RETRIEVAL_ANALYSIS_CANDIDATES", "60"))
+RETRIEVAL_TOKENS = int(os.getenv("RETRIEVAL_TOKENS", "700"))
+
+class RetrievedNote(NamedTuple):
+    date: str
+    hour: int
+    content: str
+    score: float
+
+class RetrievedAnalysis(NamedTuple):
+    date: str
+    summary: str
+    score: float
+
+class RetrievedContext(NamedTuple):
+    notes: List[RetrievedNote]
+    analyses: List[RetrievedAnalysis]
+
+def related_notes(db: Session, index, embedder, query: str, before: str,
+                  k: int = RETRIEVAL_NOTES) -> List[RetrievedNote]:
+    """The `k` notes written before `before` that are closest to `query`, in date order"""
+    if not query.strip() or index is None or not len(index):
+        return []
+    before_day = day_number(before)
+    if before_day == -1:
+        return []
+    matches, _ = index.search(embedder.embed([query])[0], k, last_day=before_day - 1)
+    scores = {note_id: score for note_id, score in matches if score >= RETRIEVAL_MIN_SIMILARITY}
+    rows = db.query(Note.id, Note.date, Note.hour, Note.content).filter(Note.id.in_(list(scores))).all()
+    return sorted(
+        (RetrievedNote(row.date, row.hour, row.content, scores[row.id]) for row in rows if row.content),
+        key=lambda note: (note.date, note.hour)
+    )
+
+def related_analyses(db: Session, query: str, before: str, k: int = RETRIEVAL_ANALYSES) -> List[RetrievedAnalysis]:
+    """Summaries of the `k` analyses of dates before `before` most related to `query`"""
+    rows = db.query(Analysis.date, Analysis.summary).filter(Analysis.date < before, Analysis.summary != "")
+    latest = {}
+    for analysis_date, summary in rows.order_by(Analysis.date.desc(), Analysis.created_at.desc()):
+        if analysis_date not in latest:
+            latest[analysis_date] = summary
+            if len(latest) == RETRIEVAL_ANALYSIS_CANDIDATES:
+                break
+    dates = list(latest)
+    # Newest first, so on equal keyword overlap the more recent analysis wins
+    scores = [
+        score + (len(dates) - rank) / (len(dates) * 10)
+        for rank, score in enumerate(relevance_scores([latest[day] for day in dates], query))
+    ]
+    best = sorted(range(len(dates)), key=lambda i: -scores[i])[:k]
+    return sorted(
+        (RetrievedAnalysis(dates[i], latest[dates[i]], scores[i]) for i in best),
+        key=lambda analysis: analysis.date
+    )
+
+def retrieve_context(db: Session, index, embedder, query: str, before: str) -> RetrievedContext:
+    """Past notes and earlier analyses for the analysis of `before`.
+
+    Retrieval only adds context, so a failing embedder leaves out the notes
+    rather than failing the analysis.
+    """
+    try:
+        notes = related_notes(db, index, embedder, query, before)
+    except Exception as e:
+        print(f"Note retrieval failed: {e}")
+        notes = []
+    return RetrievedContext(notes, related_analyses(db, query, before))
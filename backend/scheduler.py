@@ -0,0 +1,234 @@
+"""Deterministic timetable engine.
+
+Plans a day hour by hour from the user's preferences, active goals and recent
+notes, without calling the model. Fixed anchors come first (morning routine,
+meals, wind-down), then focus hours are placed where the notes show the user
+usually gets focused work done, in blocks no longer than the break frequency
+allows, with a break after each block. Focus hours are shared between goals
+by weight: goals that are far from done, due soon, called out in the day's
+analysis or rarely mentioned in recent notes get more and better hours.
+Whatever is left becomes exercise, personal or leisure time.
+"""
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from prompts import keywords
+
+class DayPreferences(NamedTuple):
+    wake_time: int
+    sleep_time: int  # before wake_time means after midnight
+    focus_hours: int
+    break_frequency: int  # minutes of focus before a break is due
+
+class GoalDemand(NamedTuple):
+    title: str
+    category: str  # TimeSlot category the goal's focus hours get
+    weight: float
+
+class RecentNote(NamedTuple):
+    hour: int
+    content: str
+    tags: List[str]
+
+FOCUS_TAGS = {"work", "study", "focused", "productive", "learning", "coding"}
+FOCUS_WORDS = {
+    "work", "worked", "working", "study", "studied", "studying", "coding", "coded",
+    "practice", "practiced", "project", "learn", "learned", "learning", "focus", "focused",
+}
+
+# Goal category words -> TimeSlot category for that goal's focus hours
+CATEGORY_SLOTS = [
+    ({"health", "fitness", "exercise", "sport"}, "exercise"),
+    ({"education", "learn", "learning", "study", "studying", "skill", "skills", "course",
+      "practice", "read", "reading", "exam", "language", "algorithms"}, "study"),
+    ({"career", "professional", "work", "finance", "money"}, "work"),
+]
+
+LUNCH_HOURS = [12, 13, 14]
+DINNER_HOURS = [18, 19, 20, 17]
+EXERCISE_HOURS = [17, 18, 16, 7, 8, 19]
+EVENING_START = 19
+
+def circadian_prior(hour: int) -> float:
+    """Typical alertness by hour, used where the notes say little"""
+    if 9 <= hour <= 11:
+        return 1.0
+    if hour in (8, 12, 15, 16):
+        return 0.8
+    if 13 <= hour <= 17:
+        return 0.6
+    if hour < 8:
+        return 0.5
+    return 0.3 if hour < 21 else 0.1
+
+def slot_category(goal_category: Optional[str], title: str) -> str:
+    words = keywords(f"{goal_category or ''} {title}")
+    for category_words, category in CATEGORY_SLOTS:
+        if words & category_words:
+            return category
+    return "work"
+
+def is_focus_note(note: RecentNote) -> bool:
+    return bool(FOCUS_TAGS & {tag.lower() for tag in note.tags} or FOCUS_WORDS & keywords(note.content))
+
+def focus_scores(recent_notes: Sequence[RecentNote], days: int) -> Dict[int, float]:
+    """Score each hour by how often recent notes show focused work then"""
+    focused: Dict[int, int] = {}
+    for note in recent_notes:
+        if is_focus_note(note):
+            focused[note.hour] = focused.get(note.hour, 0) + 1
+    return {
+        hour: circadian_prior(hour) + 2 * focused.get(hour, 0) / max(days, 1)
+        for hour in range(24)
+    }
+
+def goal_demands(goals: Iterable, recent_notes: Sequence[RecentNote], day: date, analysis: str = "") -> List[GoalDemand]:
+    """Weigh active goals (title, category, target_date, progress) for one day's plan"""
+    note_words = [keywords(f"{note.content} {' '.join(note.tags)}") for note in recent_notes]
+    analysis_words = keywords(analysis)
+    demands = []
+    for goal in goals:
+        goal_words = keywords(goal.title)
+        weight = 1.0 + (100 - (goal.progress or 0)) / 100
+        if goal.target_date is not None:
+            days_left = (goal.target_date.date() - day).days
+            if days_left <= 14:
+                weight += 2
+            elif days_left <= 60:
+                weight += 1
+        if goal_words & analysis_words:
+            weight += 1
+        # Goals the notes rarely mention are the ones being neglected
+        if sum(1 for words in note_words if words & goal_words) < 3:
+            weight += 0.5
+        demands.append(GoalDemand(goal.title, slot_category(goal.category, goal.title), weight))
+    return sorted(demands, key=lambda demand: -demand.weight)
+
+def text_goal_demands(goals_text: str) -> List[GoalDemand]:
+    """Goals from free text, one per line, when none are tracked"""
+    demands = []
+    for line in goals_text.splitlines():
+        title = line.strip(" -*•\t")
+        if len(title) > 3 and not title.endswith(":"):
+            demands.append(GoalDemand(title[:80], slot_category(None, title), 2.0))
+    return demands[:5]
+
+def share_hours(demands: Sequence[GoalDemand], hours: int) -> List[GoalDemand]:
+    """One goal per focus hour, in proportion to weight (largest remainder)"""
+    total = sum(demand.weight for demand in demands)
+    exact = [demand.weight / total * hours for demand in demands]
+    counts = [int(value) for value in exact]
+    by_remainder = sorted(range(len(demands)), key=lambda i: (-(exact[i] - counts[i]), -demands[i].weight))
+    for i in by_remainder[:hours - sum(counts)]:
+        counts[i] += 1
+    return [demand for demand, count in zip(demands, counts) for _ in range(count)]
+
+def priority_label(weight: float) -> str:
+    if weight >= 3:
+        return "high"
+    return "medium" if weight >= 2 else "low"
+
+def slot(hour: int, activity: str, description: str, priority: str, category: str) -> dict:
+    return {
+        "hour": hour,
+        "activity": activity,
+        "description": description,
+        "priority": priority,
+        "category": category,
+    }
+
+def first_free(plan: Dict[int, dict], free: List[int], candidates: Sequence[int]) -> Optional[int]:
+    for hour in candidates:
+        if hour in free and hour not in plan:
+            return hour
+    return None
+
+def run_length(focus: set, hour: int) -> int:
+    """Length of the run of consecutive focus hours through `hour`, across midnight too"""
+    start = hour
+    while (start - 1) % 24 in focus and hour - start < 23:
+        start -= 1
+    end = hour
+    while (end + 1) % 24 in focus and end - start < 23:
+        end += 1
+    return end - start + 1
+
+def focus_capacity(hours: Sequence[int], plan: Dict[int, dict], max_run: int) -> int:
+    """Most focus hours the free hours can hold with a break after every `max_run`"""
+    capacity = 0
+    stretch = 0
+    for hour in list(hours) + [None]:
+        if hour is not None and hour not in plan:
+            stretch += 1
+        else:
+            capacity += stretch - stretch // (max_run + 1)
+            stretch = 0
+    return capacity
+
+def day_hours(wake_time: int, sleep_time: int) -> List[int]:
+    """Waking hours in order; a sleep time at or before the wake time is on the next day"""
+    wake = max(0, min(wake_time, 23))
+    sleep = max(0, min(sleep_time, 24)) % 24
+    return [(wake + offset) % 24 for offset in range((sleep - wake) % 24 or 24)]
+
+def build_schedule(preferences: DayPreferences, demands: Sequence[GoalDemand],
+                   scores: Dict[int, float]) -> List[dict]:
+    """Plan every hour from wake_time to sleep_time as TimeSlot fields"""
+    hours = day_hours(preferences.wake_time, preferences.sleep_time)
+    wake, last = hours[0], hours[-1]
+    plan: Dict[int, dict] = {}
+
+    plan[wake] = slot(wake, "Morning Routine", "Wake up, hygiene, breakfast and a quick look at today's plan", "medium", "personal")
+    if last != wake:
+        plan[last] = slot(last, "Wind Down", "Screens off, light reading or journaling, prepare for sleep", "medium", "personal")
+    lunch = first_free(plan, hours, LUNCH_HOURS)
+    if lunch is not None:
+        plan[lunch] = slot(lunch, "Lunch", "Proper meal away from the desk", "medium", "meal")
+    dinner = first_free(plan, hours, DINNER_HOURS)
+    if dinner is not None:
+        plan[dinner] = slot(dinner, "Dinner", "Dinner and time to recharge", "medium", "meal")
+
+    # Focus hours go where recent notes show the most focused work, in runs
+    # no longer than the break frequency allows
+    max_run = max(1, preferences.break_frequency // 60)
+    free = [hour for hour in hours if hour not in plan]
+    wanted = max(0, min(preferences.focus_hours, focus_capacity(hours, plan, max_run)))
+    focus: set = set()
+    for hour in sorted(free, key=lambda h: (-scores.get(h, 0), h)):
+        if len(focus) >= wanted:
+            break
+        focus.add(hour)
+        if run_length(focus, hour) > max_run:
+            focus.discard(hour)
+
+    # The best hours go to the heaviest goals
+    goals = share_hours(demands, len(focus)) if demands else []
+    for hour, goal in zip(sorted(focus, key=lambda h: (-scores.get(h, 0), h)), goals):
+        if goal.category == "exercise":
+            description = f"Training session for {goal.title}: warm up, do the planned workout, cool down"
+        else:
+            description = f"Focused session on {goal.title}: pick one concrete next step and work on it without distractions"
+        plan[hour] = slot(hour, goal.title, description, priority_label(goal.weight), goal.category)
+    for hour in sorted(focus):
+        if hour not in plan:
+            plan[hour] = slot(hour, "Deep Work", "Single-task on today's most important work, notifications off", "high", "work")
+
+    # A break after every focus run
+    for hour in sorted(focus):
+        after = (hour + 1) % 24
+        if after not in focus and after in hours and after not in plan:
+            plan[after] = slot(after, "Break", "Step away from the screen: stretch, hydrate, short walk", "medium", "break")
+
+    if not any(goal.category == "exercise" for goal in goals):
+        exercise = first_free(plan, hours, EXERCISE_HOURS)
+        if exercise is not None:
+            plan[exercise] = slot(exercise, "Exercise", "Walk, run or workout to reset energy", "medium", "exercise")
+
+    for hour in hours:
+        if hour not in plan:
+            if hour >= EVENING_START or hour < wake:
+                plan[hour] = slot(hour, "Personal Time", "Hobbies, friends or family", "low", "leisure")
+            else:
+                plan[hour] = slot(hour, "Admin & Errands", "Email, chores and small tasks", "low", "personal")
+
+    return [plan[hour] for hour in hours]
@@ -0,0 +1,186 @@
+"""Hierarchical summaries of journal notes for long-range pattern analysis.
+
+Pattern analysis over weeks or months cannot send every note to the model.
+Instead each day with entries is summarized once, the day summaries of a week
+are rolled up into a week summary, and only the week summaries reach the final
+pattern prompt. Every summary is stored in `note_summaries` with a fingerprint
+of its inputs: a day is regenerated only when its notes change, and a week only
+when one of its day summaries does. Within a tier, the periods that need a
+new summary are independent and are generated concurrently (see
+llm.chat_many and LLM_PARALLELISM).
+"""
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from database import NoteSummary
+from prompts import PromptBuilder
+import llm
+import model_registry
+
+def fingerprint(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def week_start(day: str) -> str:
+    """Monday of the week containing a YYYY-MM-DD date"""
+    parsed = datetime.strptime(day, "%Y-%m-%d")
+    return (parsed - timedelta(days=parsed.weekday())).strftime("%Y-%m-%d")
+
+def format_day_entries(activities: List[dict]) -> List[str]:
+    lines = []
+    for activity in activities:
+        tags = f" [{', '.join(activity['tags'])}]" if activity['tags'] else ""
+        lines.append(f"{activity['hour']}:00 - {activity['content'].strip()}{tags}")
+    return lines
+
+def day_prompt(day: str, entries: List[str]) -> str:
+    return (
+        PromptBuilder("summarize_day")
+        .text(
+            f"Summarize this journal day ({day}) in 3-4 sentences. Mention main activities, "
+            "when they happened, mood or energy, and anything that helped or hindered progress."
+        )
+        .section("", entries, max_item_tokens=150)
+        .text("Summary:")
+        .build()
+    )
+
+def week_prompt(start: str, day_summaries: List[Tuple[str, str]]) -> str:
+    return (
+        PromptBuilder("summarize_week")
+        .text(
+            f"Combine these daily journal summaries for the week of {start} into one paragraph of "
+            "at most 6 sentences. Keep recurring habits, time-of-day patterns, mood trends and "
+            "progress or struggles; drop one-off details."
+        )
+        .section("", [f"{day}: {summary}" for day, summary in day_summaries])
+        .text("Weekly summary:")
+        .build()
+    )
+
+class SummaryStore:
+    """Loads and saves summaries for one pattern-analysis run.
+
+    `deadline` (a time.monotonic() value) bounds every generation of the run;
+    periods not summarized by then are left for the next run.
+    """
+
+    def __init__(self, db: Session, deadline: Optional[float] = None):
+        self.db = db
+        self.deadline = deadline
+
+    def refresh(self, period: str, sources: Dict[str, Tuple[str, str]]) -> Dict[str, str]:
+        """Return {period_start: summary} for `sources` of {period_start: (source_hash, prompt)}.
+
+        Stored summaries with a matching fingerprint are reused. The rest are
+        generated together through llm.chat_many, so independent periods run
+        in parallel up to the model server's limit. New summaries are upserted,
+        since off-peak precomputation may store the same period meanwhile.
+        """
+        existing = {}
+        if sources:
+            rows = self.db.query(NoteSummary).filter(
+                NoteSummary.period == period,
+                NoteSummary.period_start.in_(list(sources))
+            ).all()
+            existing = {row.period_start: row for row in rows}
+
+        summaries = {}
+        stale = {}
+        for start, (source_hash, prompt) in sources.items():
+            row = existing.get(start)
+            if row is not None and row.source_hash == source_hash:
+                summaries[start] = row.summary
+            else:
+                stale[start] = prompt
+
+        route = f"summarize_{period}"
+        model = model_registry.route(route).model
+        errors = []
+        generated = []
+        for start, result in llm.chat_many(stale, route=route, deadline=self.deadline).items():
+            if isinstance(result, Exception):
+                errors.append(result)
+                continue
+            summaries[start] = result.strip()
+            generated.append({
+                "period": period,
+                "period_start": start,
+                "source_hash": sources[start][0],
+                "summary": summaries[start],
+                "model_used": model,
+                "created_at": datetime.now(),
+            })
+
+        # Keep what finished even if some periods failed, then report the failure
+        if generated:
+            statement = insert(NoteSummary).values(generated)
+            self.db.execute(statement.on_conflict_do_update(
+                index_elements=["period", "period_start"],
+                set_={
+                    column: statement.excluded[column]
+                    for column in ("source_hash", "summary", "model_used", "created_at")
+                }
+            ))
+        self.db.commit()
+        if errors:
+            raise errors[0]
+        return summaries
+
+def day_fingerprint(activities: List[dict]) -> str:
+    return fingerprint("\n".join(format_day_entries(activities)))
+
+def stale_days(db: Session, daily_activities: Dict[str, List[dict]]) -> List[str]:
+    """Days with entries whose stored summary is missing or out of date"""
+    days = [day for day, activities in daily_activities.items() if activities]
+    stored = dict(
+        db.query(NoteSummary.period_start, NoteSummary.source_hash)
+        .filter(NoteSummary.period == "day", NoteSummary.period_start.in_(days))
+        .all()
+    ) if days else {}
+    return sorted(day for day in days if stored.get(day) != day_fingerprint(daily_activities[day]))
+
+def summarize_days(store: SummaryStore, daily_activities: Dict[str, List[dict]]) -> Dict[str, Tuple[str, str]]:
+    """Return {day: (fingerprint, summary)} for every day that has entries"""
+    sources = {}
+    for day in sorted(day for day, activities in daily_activities.items() if activities):
+        entries = format_day_entries(daily_activities[day])
+        sources[day] = (day_fingerprint(daily_activities[day]), day_prompt(day, entries))
+
+    summaries = store.refresh("day", sources)
+    return {day: (sources[day][0], summaries[day]) for day in sources}
+
+def summarize_weeks(store: SummaryStore, day_summaries: Dict[str, Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Roll day summaries up into [(week_start, summary)] in date order"""
+    weeks: Dict[str, List[str]] = {}
+    for day in sorted(day_summaries):
+        weeks.setdefault(week_start(day), []).append(day)
+
+    sources = {}
+    for start, days in weeks.items():
+        # A week with a single day is just that day's summary
+        if len(days) > 1:
+            pairs = [(day, day_summaries[day][1]) for day in days]
+            sources[start] = (
+                fingerprint(*(day_summaries[day][0] for day in days)),
+                week_prompt(start, pairs)
+            )
+
+    summaries = store.refresh("week", sources)
+    return [
+        (start, summaries[start] if start in summaries else day_summaries[days[0]][1])
+        for start, days in weeks.items()
+    ]
+
+def summarize_range(db: Session, daily_activities: Dict[str, List[dict]],
+                    deadline: Optional[float] = None) -> List[Tuple[str, str]]:
+    """Weekly summaries for the given notes, reusing every stored tier still valid"""
+    store = SummaryStore(db, deadline)
+    return summarize_weeks(store, summarize_days(store, daily_activities))
@@ -0,0 +1,141 @@
+"""Per-call telemetry of the model server, stored in the llm_calls table.
+
+Every streamed generation and embedding request is recorded once it ends,
+with the response metadata Ollama reports on its final part: prompt and
+completion token counts and the load / prompt evaluation / generation time
+breakdown. From those come the generation speed and whether the prompt was
+served from the server's cache: a call counts as a cache hit when the server
+evaluated less than half of the prompt, i.e. the rest was a prefix (such as
+the system prompt) kept from the previous call. Embedding calls reuse no
+prompt prefix, so they are recorded without one. Calls cut off at their
+deadline or failing are recorded too, with whatever the server reported.
+
+Rows older than LLM_TELEMETRY_DAYS (default 30) are pruned as new ones are
+written. `summary` reports percentiles per endpoint and model.
+"""
+import math
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+from database import LLMCall, SessionLocal
+from prompts import CHARS_PER_TOKEN
+
+LLM_TELEMETRY_DAYS = float(os.getenv("LLM_TELEMETRY_DAYS", "30"))
+
+# Share of the prompt the server may evaluate for the call to count as a cache hit
+CACHE_HIT_RATIO = 0.5
+
+PERCENTILES = (50, 90, 99)
+SUMMARY_FIELDS = (
+    "wall_time", "total_time", "load_time", "prompt_eval_time", "eval_time",
+    "tokens_per_second", "prompt_tokens", "completion_tokens",
+)
+
+def seconds(stats: dict, key: str) -> Optional[float]:
+    value = stats.get(key)
+    return value / 1e9 if value is not None else None
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of values sorted ascending"""
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+class LLMTelemetry:
+    def __init__(self, retention_days: float = LLM_TELEMETRY_DAYS, prune_every: int = 500):
+        self.retention_days = retention_days
+        self.prune_every = prune_every
+        self._lock = threading.Lock()
+        self._since_prune = 0
+
+    def record(self, endpoint: str, model: str, outcome: str, stats: dict, wall_time: float, prompt_chars: int,
+               prompt_cache: bool = True):
+        """Store one call; `stats` is the final response part, or {} if none arrived.
+
+        `prompt_cache` is False for calls that cannot reuse a cached prompt
+        prefix, such as embeddings; their cache_hit is left empty. Telemetry
+        never fails the call it describes, so errors are only logged.
+        """
+        stats = stats or {}
+        prompt_tokens = stats.get("prompt_eval_count")
+        estimated = math.ceil(prompt_chars / CHARS_PER_TOKEN) if prompt_chars else None
+        eval_time = seconds(stats, "eval_duration")
+        completion_tokens = stats.get("eval_count")
+        row = LLMCall(
+            endpoint=endpoint,
+            model=model,
+            outcome=outcome,
+            prompt_tokens=prompt_tokens,
+            estimated_prompt_tokens=estimated,
+            completion_tokens=completion_tokens,
+            load_time=seconds(stats, "load_duration"),
+            prompt_eval_time=seconds(stats, "prompt_eval_duration"),
+            eval_time=eval_time,
+            total_time=seconds(stats, "total_duration"),
+            wall_time=wall_time,
+            tokens_per_second=completion_tokens / eval_time if completion_tokens and eval_time else None,
+            cache_hit=(
+                prompt_tokens < estimated * CACHE_HIT_RATIO
+                if prompt_cache and prompt_tokens is not None and estimated else None
+            ),
+            created_at=datetime.now(timezone.utc),
+        )
+        with self._lock:
+            self._since_prune += 1
+            prune = self._since_prune >= self.prune_every
+            if prune:
+                self._since_prune = 0
+        db = SessionLocal()
+        try:
+            db.add(row)
+            if prune:
+                cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+                db.query(LLMCall).filter(LLMCall.created_at < cutoff).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            print(f"Recording LLM telemetry failed: {e}")
+        finally:
+            db.close()
+
+    def summary(self, hours: float = 24, endpoint: Optional[str] = None) -> Dict[str, dict]:
+        """Call counts, cache hit rate and percentiles per "endpoint (model)" over the last `hours`"""
+        columns = [LLMCall.endpoint, LLMCall.model, LLMCall.outcome, LLMCall.cache_hit]
+        columns += [getattr(LLMCall, field) for field in SUMMARY_FIELDS]
+        db = SessionLocal()
+        try:
+            query = db.query(*columns).filter(
+                LLMCall.created_at >= datetime.now(timezone.utc) - timedelta(hours=hours)
+            )
+            if endpoint:
+                query = query.filter(LLMCall.endpoint == endpoint)
+            rows = query.all()
+        finally:
+            db.close()
+
+        groups: Dict[str, List] = {}
+        for row in rows:
+            groups.setdefault(f"{row.endpoint} ({row.model})", []).append(row)
+
+        result = {}
+        for key, items in sorted(groups.items()):
+            outcomes: Dict[str, int] = {}
+            for item in items:
+                outcomes[item.outcome] = outcomes.get(item.outcome, 0) + 1
+            known = [item.cache_hit for item in items if item.cache_hit is not None]
+            stats = {}
+            for field in SUMMARY_FIELDS:
+                values = sorted(getattr(item, field) for item in items if getattr(item, field) is not None)
+                if values:
+                    stats[field] = {f"p{pct}": round(percentile(values, pct), 4) for pct in PERCENTILES}
+            result[key] = {
+                "endpoint": items[0].endpoint,
+                "model": items[0].model,
+                "calls": len(items),
+                "outcomes": outcomes,
+                "cache_hit_rate": round(sum(known) / len(known), 3) if known else None,
+                **stats,
+            }
+        return result
+
+llm_telemetry = LLMTelemetry()
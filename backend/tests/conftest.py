@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules are imported top-level, as uvicorn runs them from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def journal_db(tmp_path, monkeypatch):
+    """A freshly migrated journal database in a temporary directory.
+
+    The app's sessions are bound to it for the test, so the database file
+    in backend/ is never touched.
+    """
+    from sqlalchemy import create_engine
+
+    import database
+
+    original = database.engine
+    engine = create_engine(f"sqlite:///{tmp_path / 'journal.db'}", connect_args={"check_same_thread": False})
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "_initialized", False)
+    database.SessionLocal.configure(bind=engine)
+    try:
+        database.init_database()
+        yield tmp_path
+    finally:
+        database.SessionLocal.configure(bind=original)
+        engine.dispose()
@@ -0,0 +1,157 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import llm
+import main
+from database import Analysis, Note, SessionLocal
+
+DAY = "2025-03-04"
+
+@pytest.fixture
+def client(journal_db):
+    # Without `with`, the lifespan (model preload, precompute) does not start
+    return TestClient(main.app)
+
+@pytest.fixture
+def replies(monkeypatch):
+    """Stub the model: each route answers with its name and a call number"""
+    calls = []
+
+    def chat_reply(prompt, route="analyze", system=None, deadline=None):
+        calls.append(route)
+        return llm.Reply(f"{route} analysis #{len(calls)}", False, {})
+
+    monkeypatch.setattr(llm, "chat_reply", chat_reply)
+    return calls
+
+def add_notes(day, *contents):
+    db = SessionLocal()
+    try:
+        for hour, content in enumerate(contents, start=9):
+            db.add(Note(date=day, hour=hour, content=content))
+        db.commit()
+    finally:
+        db.close()
+
+def store_analysis(day, tier, *contents):
+    db = SessionLocal()
+    try:
+        notes = [{"time": hour, "note": content} for hour, content in enumerate(contents, start=9)]
+        db.add(Analysis(date=day, ai_response=f"{tier} text", notes_content=notes, goals_content="",
+                        tier=tier, version=1))
+        db.commit()
+    finally:
+        db.close()
+
+def run_batch(client, **body):
+    job = client.post("/analyze/batch", json={"start_date": DAY, "end_date": DAY, **body}).json()
+    for _ in range(200):
+        snapshot = client.get(f"/analyze/batch/{job['job_id']}").json()
+        if snapshot["state"] == "finished":
+            return {item["key"]: item["status"] for item in snapshot["items"]}
+        time.sleep(0.01)
+    raise AssertionError("batch job did not finish")
+
+def stored_tier(day):
+    db = SessionLocal()
+    try:
+        return main.latest_analyses(db, day, day)[day].tier
+    finally:
+        db.close()
+
+def test_batch_redoes_a_draft_left_without_refinement(client, replies):
+    add_notes(DAY, "Wrote the report")
+    store_analysis(DAY, "draft", "Wrote the report")
+
+    assert run_batch(client) == {DAY: "done"}
+    assert replies == ["analyze"]
+    assert stored_tier(DAY) == "full"
+
+def test_batch_skips_a_complete_current_analysis(client, replies):
+    add_notes(DAY, "Wrote the report")
+    store_analysis(DAY, "refined", "Wrote the report")
+
+    assert run_batch(client) == {DAY: "skipped"}
+    assert replies == []
+
+def test_batch_redoes_an_analysis_of_older_notes(client, replies):
+    add_notes(DAY, "Wrote the report", "Went running")
+    store_analysis(DAY, "full", "Wrote the report")
+
+    assert run_batch(client) == {DAY: "done"}
+
+def test_batch_force_redoes_everything(client, replies):
+    add_notes(DAY, "Wrote the report")
+    store_analysis(DAY, "full", "Wrote the report")
+
+    assert run_batch(client, force=True) == {DAY: "done"}
+
+def test_draft_is_stale_for_precompute(journal_db, monkeypatch):
+    monkeypatch.setattr(main, "precompute_range", lambda: main.AnalyticsRequest(
+        start_date=DAY, end_date=DAY, analysis_type="patterns"
+    ))
+    add_notes(DAY, "Wrote the report")
+    store_analysis(DAY, "draft", "Wrote the report")
+    assert main.stale_analysis_dates() == [DAY]
+
+def analyze(client, **body):
+    request = {"notes": [{"time": 9, "note": "Wrote the report"}], "goals": "Finish the report", "date": DAY}
+    return client.post("/analyze", json={**request, **body}).json()
+
+def stored_row(day):
+    db = SessionLocal()
+    try:
+        row = main.latest_analyses(db, day, day)[day]
+        return row.tier, row.version, row.ai_response
+    finally:
+        db.close()
+
+def test_tiered_draft_is_refined_in_the_background(client, replies):
+    draft = analyze(client, tiered=True)
+    assert (draft["tier"], draft["version"], draft["analysis"]) == ("draft", 1, "analyze_draft analysis #1")
+
+    # The test client runs background tasks before returning
+    assert replies == ["analyze_draft", "analyze"]
+    assert stored_row(DAY) == ("refined", 2, "analyze analysis #2")
+
+    cached = analyze(client)
+    assert cached["cached"] and cached["tier"] == "refined" and cached["version"] == 2
+    assert len(replies) == 2
+
+def test_draft_does_not_wait_for_retrieval(journal_db, replies, monkeypatch):
+    retrieved = []
+    monkeypatch.setattr(main, "analysis_context", lambda *args: retrieved.append(args))
+    tasks = main.BackgroundTasks()
+    request = main.AnalysisRequest(notes=[main.HourNote(time=9, note="Wrote the report")], goals="", date=DAY)
+    db = SessionLocal()
+    try:
+        response = main.analyze_tiered(request, DAY, tasks, db, time.time())
+    finally:
+        db.close()
+
+    assert response.tier == "draft"
+    assert retrieved == []
+    assert [task.func for task in tasks.tasks] == [main.refine_analysis]
+
+def test_refinement_keeps_a_newer_analysis(client, replies, monkeypatch):
+    refine = main.refine_analysis
+    monkeypatch.setattr(main, "refine_analysis", lambda *args: None)
+    draft = analyze(client, tiered=True)
+    analyze(client, refresh=True)
+    assert stored_row(DAY) == ("full", 2, "analyze analysis #2")
+
+    # The draft's refinement finishing late must not overwrite the newer analysis
+    request = main.AnalysisRequest(notes=[main.HourNote(time=9, note="Wrote the report")], goals="", date=DAY)
+    refine(draft["analysis_id"], draft["version"], request, DAY)
+    assert replies == ["analyze_draft", "analyze", "analyze"]
+    assert stored_row(DAY) == ("full", 2, "analyze analysis #2")
+
+def test_cut_off_refinement_keeps_the_draft(client, monkeypatch):
+    def chat_reply(prompt, route="analyze", system=None, deadline=None):
+        return llm.Reply(f"{route} text", route == "analyze", {})
+
+    monkeypatch.setattr(llm, "chat_reply", chat_reply)
+    analyze(client, tiered=True)
+    assert stored_row(DAY) == ("draft", 1, "analyze_draft text")
@@ -0,0 +1,115 @@
+import time
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+class Probe:
+    """Probe that fails until `healthy` is set, counting its calls"""
+
+    def __init__(self):
+        self.healthy = False
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if not self.healthy:
+            raise ConnectionError("server down")
+
+def wait_for(condition, timeout=2.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+def test_opens_after_threshold_consecutive_failures():
+    breaker = CircuitBreaker(Probe(), threshold=3, probe_interval=60)
+    for _ in range(2):
+        breaker.record_failure(ConnectionError("refused"))
+    breaker.check()
+    assert not breaker.is_open
+
+    breaker.record_failure(ConnectionError("refused"))
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError, match="refused"):
+        breaker.check()
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(Probe(), threshold=2, probe_interval=60)
+    breaker.record_failure(ConnectionError("refused"))
+    breaker.record_success()
+    breaker.record_failure(ConnectionError("refused"))
+    assert not breaker.is_open
+    assert breaker.status()["consecutive_failures"] == 1
+
+def test_probe_keeps_it_open_while_failing_then_closes():
+    probe = Probe()
+    breaker = CircuitBreaker(probe, threshold=1, probe_interval=0.01)
+    breaker.record_failure(ConnectionError("refused"))
+
+    # Half-open: probes run in the background but calls are still refused
+    assert wait_for(lambda: probe.calls >= 2)
+    assert breaker.is_open
+    assert breaker.status()["last_error"] == "server down"
+
+    probe.healthy = True
+    assert wait_for(lambda: not breaker.is_open)
+    breaker.check()
+    assert breaker.status() == {
+        "state": "closed", "consecutive_failures": 0, "opened_at": None, "last_error": "server down",
+    }
+
+def test_reopens_after_recovery():
+    probe = Probe()
+    probe.healthy = True
+    breaker = CircuitBreaker(probe, threshold=1, probe_interval=0.01)
+    breaker.record_failure(ConnectionError("refused"))
+    assert wait_for(lambda: not breaker.is_open)
+
+    probe.healthy = False
+    breaker.record_failure(ConnectionError("refused again"))
+    assert breaker.is_open
+    assert wait_for(lambda: probe.calls >= 2)
+
+class ModelNotFound(Exception):
+    status_code = 404
+
+class Server:
+    """Ollama stand-in whose list() fails while the server is down"""
+
+    def __init__(self):
+        self.up = True
+
+    def list(self):
+        if not self.up:
+            raise ConnectionError("server down")
+        return {"models": []}
+
+def test_missing_model_does_not_open_the_shared_circuit():
+    import llm
+
+    breaker = CircuitBreaker(llm.probe_server, threshold=2, probe_interval=60)
+    for _ in range(3):
+        with pytest.raises(ModelNotFound):
+            with llm._guarded(breaker):
+                raise ModelNotFound("model 'fast:1b' not found")
+    assert not breaker.is_open
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            with llm._guarded(breaker):
+                raise ConnectionError("refused")
+    assert breaker.is_open
+
+def test_probe_only_needs_the_server_to_answer(monkeypatch):
+    import llm
+
+    server = Server()
+    monkeypatch.setattr(llm, "get_ollama", lambda: server)
+    llm.probe_server()
+
+    server.up = False
+    with pytest.raises(ConnectionError):
+        llm.probe_server()
@@ -0,0 +1,37 @@
+from cache import DataVersions
+
+def test_empty_range_is_zero():
+    versions = DataVersions()
+    assert versions.max_in_range("2025-01-01", "2025-12-31") == 0
+
+def test_range_bounds_are_inclusive():
+    versions = DataVersions()
+    versions.bump_dates("2025-03-01")
+    first = versions.max_in_range("2025-03-01", "2025-03-01")
+    assert first > 0
+    assert versions.max_in_range("2025-02-01", "2025-03-01") == first
+    assert versions.max_in_range("2025-03-01", "2025-03-31") == first
+    assert versions.max_in_range("2025-03-02", "2025-03-31") == 0
+
+def test_write_inside_range_raises_its_stamp():
+    versions = DataVersions()
+    versions.bump_dates("2025-03-05", "2025-04-10")
+    before = versions.max_in_range("2025-03-01", "2025-03-31")
+
+    versions.bump_dates("2025-03-02")
+    assert versions.max_in_range("2025-03-01", "2025-03-31") > before
+
+def test_write_outside_range_leaves_it_unchanged():
+    versions = DataVersions()
+    versions.bump_dates("2025-03-05")
+    before = versions.max_in_range("2025-03-01", "2025-03-31")
+
+    versions.bump_dates("2025-04-01", "2025-02-28")
+    assert versions.max_in_range("2025-03-01", "2025-03-31") == before
+
+def test_scopes_share_the_sequence_with_dates():
+    versions = DataVersions()
+    versions.bump_dates("2025-03-05")
+    versions.bump_scope("goals")
+    assert versions.scope("goals") > versions.max_in_range("2025-03-05", "2025-03-05")
+    assert versions.scope("tags") == 0
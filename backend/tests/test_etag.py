@@ -0,0 +1,47 @@
+from cache import ReferenceDataCache, etag_matches
+
+ETAG = '"abc123"'
+
+def test_no_header_never_matches():
+    assert not etag_matches(None, ETAG)
+    assert not etag_matches("", ETAG)
+
+def test_exact_etag_matches():
+    assert etag_matches('"abc123"', ETAG)
+
+def test_etag_in_list_matches():
+    assert etag_matches('"old", "abc123" , "older"', ETAG)
+
+def test_other_etag_does_not_match():
+    assert not etag_matches('"abc124"', ETAG)
+    assert not etag_matches("abc123", ETAG)
+
+def test_wildcard_matches():
+    assert etag_matches("*", ETAG)
+
+def test_cached_body_is_dropped_on_invalidate():
+    cache = ReferenceDataCache()
+    etag, body = cache.put("tags", None, cache.version("tags"), b"[]")
+    assert cache.get("tags") == (etag, body)
+
+    cache.invalidate("tags")
+    assert cache.get("tags") is None
+
+def test_body_built_before_a_write_is_not_cached():
+    cache = ReferenceDataCache()
+    version = cache.version("tags")
+    cache.invalidate("tags")
+    cache.put("tags", None, version, b"[]")
+    assert cache.get("tags") is None
+
+def test_least_recently_used_bodies_are_dropped_past_the_limit():
+    cache = ReferenceDataCache(max_entries=2)
+    version = cache.version("templates")
+    cache.put("templates", "morning", version, b"[1]")
+    cache.put("templates", "evening", version, b"[2]")
+    assert cache.get("templates", "morning") is not None
+
+    cache.put("templates", "no-such-category", version, b"[]")
+    assert cache.get("templates", "evening") is None
+    assert cache.get("templates", "morning") is not None
+    assert cache.get("templates", "no-such-category") is not None
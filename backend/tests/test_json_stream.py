@@ -0,0 +1,46 @@
+from json_stream import ArrayItemParser
+
+def feed_all(chunks):
+    parser = ArrayItemParser()
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    return items
+
+def test_items_are_returned_as_they_close():
+    parser = ArrayItemParser()
+    assert parser.feed('{"schedule": [{"hour": 7}, {"ho') == [{"hour": 7}]
+    assert parser.feed('ur": 8}]}') == [{"hour": 8}]
+
+def test_braces_and_brackets_inside_strings():
+    text = '{"schedule": [{"activity": "Plan {week} [draft]", "hour": 9}, {"activity": "}]{[", "hour": 10}]}'
+    assert feed_all([text]) == [
+        {"activity": "Plan {week} [draft]", "hour": 9},
+        {"activity": "}]{[", "hour": 10},
+    ]
+
+def test_escaped_quotes_and_backslashes():
+    text = r'[{"note": "say \"hi\" {"}, {"note": "path C:\\"}, {"note": "end"}]'
+    assert feed_all([text]) == [{"note": 'say "hi" {'}, {"note": "path C:\\"}, {"note": "end"}]
+
+def test_escape_split_across_chunks():
+    chunks = ['[{"note": "a\\', '"}"}, {"n": 1}]']
+    assert feed_all(chunks) == [{"note": 'a"}'}, {"n": 1}]
+
+def test_one_character_at_a_time():
+    text = '{"items": [{"a": [1, 2], "b": {"c": "]"}}, {"a": []}]}'
+    assert feed_all(list(text)) == [{"a": [1, 2], "b": {"c": "]"}}, {"a": []}]
+
+def test_cut_off_input_keeps_complete_items():
+    text = '{"schedule": [{"hour": 7}, {"hour": 8}, {"hour": 9, "activity": "Wri'
+    assert feed_all([text]) == [{"hour": 7}, {"hour": 8}]
+
+def test_nested_objects_are_not_returned_separately():
+    text = '[{"slot": {"hour": 7}}]'
+    assert feed_all([text]) == [{"slot": {"hour": 7}}]
+
+def test_objects_outside_arrays_are_ignored():
+    assert feed_all(['{"hour": 7, "meta": {"x": 1}}']) == []
+
+def test_invalid_item_is_skipped():
+    assert feed_all(['[{"hour": 7,}, {"hour": 8}]']) == [{"hour": 8}]
@@ -0,0 +1,119 @@
+import time
+
+import pytest
+
+import llm
+import model_registry
+
+class FakeClient:
+    """Stands in for ollama.Client: streams replies part by part, slowly if asked"""
+
+    def __init__(self, server, timeout=None):
+        self.server = server
+        self.timeout = timeout
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.server.closed += 1
+
+    def chat(self, model, messages, stream=False, **options):
+        self.server.prompts.append(messages[-1]["content"])
+        return self._parts()
+
+    def _parts(self):
+        for word in self.server.words:
+            time.sleep(self.server.part_delay)
+            yield {"message": {"role": "assistant", "content": word}, "done": False}
+        yield {"message": {"role": "assistant", "content": ""}, "done": True, "eval_count": len(self.server.words)}
+
+    def embed(self, model, input, **options):
+        if self.timeout is not None and self.server.embed_delay > self.timeout:
+            time.sleep(self.timeout)
+            raise TimeoutError("read timed out")
+        time.sleep(self.server.embed_delay)
+        return {"embeddings": [[1.0, 0.0] for _ in input]}
+
+class FakeServer:
+    def __init__(self):
+        self.words = ["one ", "two ", "three"]
+        self.part_delay = 0.0
+        self.embed_delay = 0.0
+        self.prompts = []
+        self.closed = 0
+
+    def Client(self, timeout=None):
+        return FakeClient(self, timeout)
+
+@pytest.fixture
+def server(monkeypatch):
+    fake = FakeServer()
+    monkeypatch.setattr(llm, "get_ollama", lambda: fake)
+    monkeypatch.setattr(llm, "circuit", llm.CircuitBreaker(lambda: None, threshold=1, probe_interval=60))
+    monkeypatch.setattr(llm, "embedding_circuits", {})
+    monkeypatch.setattr(llm.llm_telemetry, "record", lambda *args, **kwargs: None)
+    return fake
+
+def set_deadline(monkeypatch, route, seconds):
+    monkeypatch.setitem(model_registry.model_routes, route, model_registry.route(route)._replace(deadline=seconds))
+
+def test_reply_within_deadline(server):
+    reply = llm.chat_reply("hello", "summarize_day")
+    assert reply == llm.Reply("one two three", False, reply.stats)
+    assert reply.stats["eval_count"] == 3
+    assert server.closed == 1
+
+def test_reply_cut_off_at_route_deadline(server, monkeypatch):
+    set_deadline(monkeypatch, "summarize_day", 0.15)
+    server.part_delay = 0.1
+    reply = llm.chat_reply("hello", "summarize_day")
+    assert reply.truncated
+    assert reply.text.startswith("one ") and "three" not in reply.text
+    with pytest.raises(llm.DeadlineExceeded):
+        llm.chat("hello", "summarize_day")
+    # A slow reply does not count as the server failing
+    assert not llm.circuit.is_open
+
+def test_caller_deadline_ends_the_call_before_the_route_deadline(server):
+    server.part_delay = 0.1
+    reply = llm.chat_reply("hello", "summarize_day", deadline=time.monotonic() + 0.15)
+    assert reply.truncated
+
+def test_deadline_for_takes_the_earlier_limit(monkeypatch):
+    set_deadline(monkeypatch, "summarize_day", 60)
+    limit = time.monotonic() + 1
+    assert llm.deadline_for("summarize_day", limit) == limit
+    assert llm.deadline_for("summarize_day", limit + 120) < limit + 120
+    set_deadline(monkeypatch, "summarize_day", None)
+    assert llm.deadline_for("summarize_day") is None
+    assert llm.deadline_for("summarize_day", limit) == limit
+
+def test_chat_many_skips_prompts_once_the_deadline_passes(server, monkeypatch):
+    monkeypatch.setattr(llm, "LLM_PARALLELISM", 1)
+    server.part_delay = 0.05
+    results = llm.chat_many(
+        {day: f"summarize {day}" for day in ("mon", "tue", "wed")}, "summarize_day",
+        deadline=time.monotonic() + 0.25
+    )
+    assert results["mon"] == "one two three"
+    assert isinstance(results["tue"], llm.DeadlineExceeded)
+    assert isinstance(results["wed"], llm.DeadlineExceeded)
+    # Tuesday was cut off mid-reply; Wednesday never reached the server
+    assert server.prompts == ["summarize mon", "summarize tue"]
+
+def test_chat_many_with_a_past_deadline_calls_nothing(server):
+    results = llm.chat_many({"mon": "a", "tue": "b"}, "summarize_day", deadline=time.monotonic() - 1)
+    assert all(isinstance(result, llm.DeadlineExceeded) for result in results.values())
+    assert server.prompts == []
+
+def test_embed_times_out_without_opening_its_circuit(server, monkeypatch):
+    set_deadline(monkeypatch, "embed", 0.05)
+    server.embed_delay = 1
+    with pytest.raises(llm.DeadlineExceeded):
+        llm.embed(["note"], "embedder")
+    assert not llm.embedding_circuit("embedder").is_open
+    assert server.closed == 1
+
+    server.embed_delay = 0
+    assert llm.embed(["a", "b"], "embedder") == [[1.0, 0.0], [1.0, 0.0]]
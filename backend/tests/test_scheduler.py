@@ -0,0 +1,59 @@
+from scheduler import DayPreferences, GoalDemand, build_schedule, day_hours, focus_capacity, slot_category
+
+def plan(wake, sleep, focus_hours=4, break_frequency=90, demands=()):
+    return build_schedule(DayPreferences(wake, sleep, focus_hours, break_frequency), list(demands), {})
+
+def hours_of(schedule, category):
+    return [slot["hour"] for slot in schedule if slot["category"] == category]
+
+def test_every_waking_hour_is_planned_once():
+    schedule = plan(7, 23)
+    assert [slot["hour"] for slot in schedule] == list(range(7, 23))
+    assert schedule[0]["activity"] == "Morning Routine"
+    assert schedule[-1]["activity"] == "Wind Down"
+
+def test_short_day_still_gets_focus_time():
+    schedule = plan(9, 12, focus_hours=10)
+    assert [slot["hour"] for slot in schedule] == [9, 10, 11]
+    assert hours_of(schedule, "work") == [10]
+
+def test_focus_runs_are_split_by_breaks():
+    schedule = plan(7, 23, focus_hours=6, break_frequency=90)
+    by_hour = {slot["hour"]: slot for slot in schedule}
+    for hour in hours_of(schedule, "work"):
+        # One-hour runs: the next hour is never focus time again
+        assert by_hour.get(hour + 1, {}).get("category") != "work"
+
+def test_focus_hours_never_exceed_the_request():
+    assert len(hours_of(plan(7, 23, focus_hours=3, break_frequency=180), "work")) == 3
+
+def test_focus_capacity_follows_the_break_pattern():
+    hours = list(range(8, 14))
+    assert focus_capacity(hours, {}, 1) == 3
+    assert focus_capacity(hours, {}, 2) == 4
+    assert focus_capacity(hours, {10: {}}, 2) == 4
+    assert focus_capacity([], {}, 2) == 0
+
+def test_overnight_sleep_wraps_past_midnight():
+    assert day_hours(20, 2) == [20, 21, 22, 23, 0, 1]
+    schedule = plan(20, 2, focus_hours=2, break_frequency=120)
+    assert [slot["hour"] for slot in schedule] == [20, 21, 22, 23, 0, 1]
+    assert schedule[-1]["activity"] == "Wind Down"
+
+def test_midnight_sleep_time():
+    assert day_hours(7, 24) == list(range(7, 24))
+    assert day_hours(7, 0) == list(range(7, 24))
+
+def test_learning_goals_get_study_time():
+    assert slot_category(None, "Learn DSA") == "study"
+    assert slot_category("Personal", "Finish the Spanish course") == "study"
+
+def test_goal_categories():
+    assert slot_category("Health", "Run a 10k") == "exercise"
+    assert slot_category("Career", "Ship the billing project") == "work"
+    assert slot_category(None, "Ship the billing project") == "work"
+
+def test_focus_hours_go_to_goals():
+    demands = [GoalDemand("Learn DSA", "study", 3.0)]
+    schedule = plan(7, 23, focus_hours=2, demands=demands)
+    assert [slot["activity"] for slot in schedule if slot["category"] == "study"] == ["Learn DSA", "Learn DSA"]
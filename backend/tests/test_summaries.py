@@ -0,0 +1,74 @@
+import llm
+import summaries
+from database import NoteSummary, SessionLocal
+
+def store_summary(period, start, source_hash, text):
+    db = SessionLocal()
+    try:
+        db.add(NoteSummary(period=period, period_start=start, source_hash=source_hash, summary=text))
+        db.commit()
+    finally:
+        db.close()
+
+def stored(period):
+    db = SessionLocal()
+    try:
+        return {
+            row.period_start: (row.source_hash, row.summary)
+            for row in db.query(NoteSummary).filter(NoteSummary.period == period)
+        }
+    finally:
+        db.close()
+
+def fake_chat_many(calls, on_call=None):
+    def chat_many(prompts, route="default", system=None, deadline=None):
+        calls.append(sorted(prompts))
+        if on_call is not None:
+            on_call()
+        return {key: f"summary of {prompt}" for key, prompt in prompts.items()}
+    return chat_many
+
+def test_matching_summaries_are_reused(journal_db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(llm, "chat_many", fake_chat_many(calls))
+    store_summary("day", "2025-03-03", "h1", "old monday")
+
+    db = SessionLocal()
+    try:
+        result = summaries.SummaryStore(db).refresh("day", {
+            "2025-03-03": ("h1", "monday notes"),
+            "2025-03-04": ("h2", "tuesday notes"),
+        })
+    finally:
+        db.close()
+
+    assert calls == [["2025-03-04"]]
+    assert result == {"2025-03-03": "old monday", "2025-03-04": "summary of tuesday notes"}
+
+def test_changed_summary_is_replaced(journal_db, monkeypatch):
+    monkeypatch.setattr(llm, "chat_many", fake_chat_many([]))
+    store_summary("day", "2025-03-03", "h1", "old monday")
+
+    db = SessionLocal()
+    try:
+        summaries.SummaryStore(db).refresh("day", {"2025-03-03": ("h2", "edited monday")})
+    finally:
+        db.close()
+
+    assert stored("day") == {"2025-03-03": ("h2", "summary of edited monday")}
+
+def test_period_stored_concurrently_is_upserted(journal_db, monkeypatch):
+    def precompute_stores_it():
+        # Off-peak precomputation stores the same day while this run generates it
+        store_summary("day", "2025-03-04", "h2", "from precompute")
+
+    monkeypatch.setattr(llm, "chat_many", fake_chat_many([], precompute_stores_it))
+
+    db = SessionLocal()
+    try:
+        result = summaries.SummaryStore(db).refresh("day", {"2025-03-04": ("h2", "tuesday notes")})
+    finally:
+        db.close()
+
+    assert result == {"2025-03-04": "summary of tuesday notes"}
+    assert stored("day") == {"2025-03-04": ("h2", "summary of tuesday notes")}
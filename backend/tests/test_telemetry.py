@@ -0,0 +1,22 @@
+from telemetry import LLMTelemetry
+
+STATS = {"prompt_eval_count": 10, "eval_count": 20, "eval_duration": 2_000_000_000}
+
+def test_cache_hit_from_evaluated_prompt_share(journal_db):
+    telemetry = LLMTelemetry()
+    # 400 characters are about 100 tokens; only 10 were evaluated
+    telemetry.record("analyze", "phi3:mini", "ok", STATS, 1.0, 400)
+    telemetry.record("analyze", "phi3:mini", "ok", {**STATS, "prompt_eval_count": 100}, 1.0, 400)
+
+    summary = telemetry.summary()["analyze (phi3:mini)"]
+    assert summary["calls"] == 2
+    assert summary["cache_hit_rate"] == 0.5
+    assert summary["tokens_per_second"]["p50"] == 10.0
+
+def test_embeddings_report_no_cache_hit_rate(journal_db):
+    telemetry = LLMTelemetry()
+    telemetry.record("embed", "nomic-embed-text", "ok", {"prompt_eval_count": 1}, 0.1, 400, prompt_cache=False)
+
+    summary = telemetry.summary()["embed (nomic-embed-text)"]
+    assert summary["calls"] == 1
+    assert summary["cache_hit_rate"] is None
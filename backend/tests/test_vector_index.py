@@ -0,0 +1,114 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from vector_index import FORMAT, VectorIndex, day_number
+
+def unit(*values):
+    return np.asarray(values, dtype=np.float32)
+
+@pytest.fixture
+def index(tmp_path):
+    return VectorIndex(str(tmp_path / "index"), "test")
+
+def test_day_number():
+    assert day_number("2025-03-02") - day_number("2025-03-01") == 1
+    assert day_number("2025-6-3") == -1
+    assert day_number("") == -1
+    assert day_number(None) == -1
+
+def test_search_finds_the_closest_notes(index):
+    index.upsert([(1, unit(1, 0, 0), 11, 100), (2, unit(0, 1, 0), 22, 100), (3, unit(1, 1, 0), 33, 100)])
+    matches, mode = index.search(unit(1, 0, 0), k=2)
+    assert mode == "exact"
+    assert [note_id for note_id, _ in matches] == [1, 3]
+    assert matches[0][1] == pytest.approx(1.0)
+    assert matches[1][1] == pytest.approx(np.sqrt(0.5))
+
+def test_upsert_replaces_a_note_in_place(index):
+    index.upsert([(1, unit(1, 0), 11, 100), (2, unit(0, 1), 22, 100)])
+    index.upsert([(1, unit(0, 1), 12, 100)])
+    assert len(index) == 2
+    assert index.count == 2
+    assert index.digest(1) == 12
+    matches, _ = index.search(unit(0, 1), k=2)
+    assert [score for _, score in matches] == pytest.approx([1.0, 1.0])
+
+def test_removed_rows_are_reused(index):
+    index.upsert([(note_id, unit(1, note_id), note_id, 100) for note_id in range(1, 5)])
+    index.remove([2, 3, 99])
+    assert sorted(index.ids()) == [1, 4]
+    assert index.digest(2) is None
+    assert {note_id for note_id, _ in index.search(unit(1, 2), k=10)[0]} == {1, 4}
+
+    index.upsert([(5, unit(1, 5), 5, 100), (6, unit(1, 6), 6, 100)])
+    # The freed rows were filled before the files grew
+    assert index.count == 4
+    assert sorted(index.ids()) == [1, 4, 5, 6]
+
+def test_grows_past_its_initial_capacity(tmp_path, monkeypatch):
+    monkeypatch.setattr("vector_index.INITIAL_CAPACITY", 2)
+    index = VectorIndex(str(tmp_path / "index"), "test")
+    index.upsert([(note_id, unit(note_id, 1), note_id, 100) for note_id in range(1, 6)])
+    assert index.count == 5
+    assert sorted(index.ids()) == [1, 2, 3, 4, 5]
+    assert index.search(unit(1, 1), k=1)[0][0][0] == 1
+
+def test_reopening_keeps_rows_free_rows_and_days(tmp_path):
+    path = str(tmp_path / "index")
+    index = VectorIndex(path, "test")
+    index.upsert([(1, unit(1, 0), 11, 100), (2, unit(0, 1), 22, 200), (3, unit(1, 1), 33, 300)])
+    index.remove([2])
+
+    reopened = VectorIndex(path, "test")
+    assert sorted(reopened.ids()) == [1, 3]
+    assert reopened.digest(3) == 33
+    assert [note_id for note_id, _ in reopened.search(unit(1, 1), k=5, first_day=200)[0]] == [3]
+    reopened.upsert([(4, unit(0, 1), 44, 400)])
+    assert reopened.count == 3
+
+def test_another_embedder_or_layout_rebuilds(tmp_path):
+    path = str(tmp_path / "index")
+    VectorIndex(path, "test").upsert([(1, unit(1, 0), 11, 100)])
+    assert len(VectorIndex(path, "other")) == 0
+
+    VectorIndex(path, "test").upsert([(1, unit(1, 0), 11, 100)])
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({**meta, "format": FORMAT - 1}, f)
+    assert len(VectorIndex(path, "test")) == 0
+
+def test_date_range_filters_rows(index):
+    index.upsert([(1, unit(1, 0), 1, 100), (2, unit(1, 0.1), 2, 200), (3, unit(1, 0.2), 3, 300),
+                  (4, unit(1, 0.3), 4, -1)])
+
+    def found(**days):
+        return sorted(note_id for note_id, _ in index.search(unit(1, 0), k=10, **days)[0])
+
+    assert found() == [1, 2, 3, 4]
+    assert found(first_day=200) == [2, 3]
+    assert found(last_day=200) == [1, 2]
+    assert found(first_day=150, last_day=250) == [2]
+    assert found(first_day=400) == []
+
+def test_ivf_search_with_a_date_filter(tmp_path):
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((8, 16)).astype(np.float32)
+    labels = rng.integers(0, 8, 2000)
+    vectors = centres[labels] + 0.1 * rng.standard_normal((2000, 16)).astype(np.float32)
+    index = VectorIndex(str(tmp_path / "index"), "test", ivf_min_rows=1000, nprobe=4)
+    index.upsert((note_id, vectors[note_id], 0, note_id % 100) for note_id in range(2000))
+
+    query = vectors[7]
+    matches, mode = index.search(query, k=10, first_day=0, last_day=9)
+    assert mode == "ivf"
+    assert matches and all(note_id % 100 <= 9 for note_id, _ in matches)
+    exact, _ = index.search(query, k=10, mode="exact", first_day=0, last_day=9)
+    assert matches[0] == exact[0]
+
+    # Rows added after the lists were built are searched too
+    index.upsert([(5000, query, 0, 5)])
+    assert index.search(query, k=1, first_day=5, last_day=5)[0][0][0] == 5000
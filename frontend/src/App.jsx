@@ -592,7 +592,7 @@ function App() {
                               {item.date}
                             </div>
                             <div className="text-muted-foreground line-clamp-2">
-                              {item.analysis.substring(0, 100)}...
+                              {item.summary.substring(0, 100)}...
                             </div>
                           </div>
                         ))}
@@ -30,15 +30,17 @@ import {
 } from './ui/card';
 import { Button } from './ui/button';
 import { Input } from './ui/input';
-import useStore from '../stores/useStore';
+import useStore, { analysisDetailKey } from '../stores/useStore';
 
 function AnalysisHistoryView() {
   const {
     analysisHistory,
     analysisHistoryPagination,
     analysisHistoryFilters,
+    analysisDetails,
     setAnalyticsSubView,
     loadAnalysisHistory,
+    loadAnalysisDetail,
     setAnalysisHistoryPage,
     setAnalysisHistoryFilters,
     clearAnalysisHistoryFilters,
@@ -134,6 +136,15 @@ function AnalysisHistoryView() {
     );
   };
 
+  const toggleAnalysis = (analysis) => {
+    if (expandedAnalysis === analysis.id) {
+      setExpandedAnalysis(null);
+      return;
+    }
+    setExpandedAnalysis(analysis.id);
+    loadAnalysisDetail(analysis.id, analysis.created_at);
+  };
+
   const renderAnalysisCard = (analysis) => {
     const isExpanded = expandedAnalysis === analysis.id;
 
@@ -159,16 +170,16 @@ function AnalysisHistoryView() {
               <div className="text-sm text-gray-700">
                 {isExpanded ? (
                   <div className="whitespace-pre-wrap">
-                    {analysis.analysis}
+                    {analysisDetails[
+                      analysisDetailKey(analysis.id, analysis.created_at)
+                    ] ?? analysis.summary}
                   </div>
                 ) : (
                   <div>
                     {analysis.summary}
-                    {analysis.analysis.length > 200 && (
+                    {analysis.has_more && (
                       <button
-                        onClick={() =>
-                          setExpandedAnalysis(analysis.id)
-                        }
+                        onClick={() => toggleAnalysis(analysis)}
                         className="text-blue-600 hover:text-blue-800 ml-1 text-xs"
                       >
                         Read more...
@@ -182,9 +193,7 @@ function AnalysisHistoryView() {
             <Button
               variant="ghost"
               size="sm"
-              onClick={() =>
-                setExpandedAnalysis(isExpanded ? null : analysis.id)
-              }
+              onClick={() => toggleAnalysis(analysis)}
               className="ml-2"
             >
               {isExpanded ? (
@@ -13,6 +13,11 @@ const debounce = (func, delay) => {
   };
 };
 
+// Cache key of a loaded analysis text: the id plus the row's created_at,
+// which changes whenever the analysis is replaced
+export const analysisDetailKey = (analysisId, createdAt) =>
+  `${analysisId}@${createdAt}`;
+
 const useStore = create(
   subscribeWithSelector((set, get) => {
     // Create persistent debounced save function
@@ -73,6 +78,7 @@ const useStore = create(
         start_date: '',
         end_date: '',
       },
+      analysisDetails: {}, // Full analysis text by id and created_at, loaded on demand
       isAnalyzing: false,
 
       // Timetable state
@@ -724,6 +730,29 @@ const useStore = create(
         }
       },
 
+      loadAnalysisDetail: async (analysisId, createdAt) => {
+        // An analysis row is rewritten in place when the day is analyzed
+        // again, so cached text is only valid for the row's created_at
+        const key = analysisDetailKey(analysisId, createdAt);
+        if (get().analysisDetails[key]) return;
+
+        try {
+          const response = await fetch(
+            `${API_BASE}/analysis/${analysisId}`
+          );
+          const result = await response.json();
+
+          set((state) => ({
+            analysisDetails: {
+              ...state.analysisDetails,
+              [key]: result.analysis,
+            },
+          }));
+        } catch (error) {
+          console.error('Failed to load analysis:', error);
+        }
+      },
+
       // Timetable actions
       generateTimetable: async () => {
         const state = get();